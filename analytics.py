@@ -0,0 +1,264 @@
+"""Dashboard computations, independent of Streamlit
+
+Every figure the dashboard shows comes from a function here taking a
+shared_data.DataSnapshot and a normalised filter selection. Results are
+memoised process-wide on (function, snapshot version, selection, args), so a
+rerun only recomputes what its filter change affects and every session shares
+the results. Results are shared, so callers must not modify them.
+"""
+import collections
+import functools
+import os
+import threading
+
+import pandas as pd
+
+import bitmap_index
+import chart_sampling
+import customer_schema
+import filter_cache
+import marketing
+import segment_cube
+
+MAX_RESULTS = 512
+
+# Row sets of recent selections, shared by all sessions and bounded in memory
+FILTER_CACHE_MB = int(os.environ.get("FILTER_CACHE_MB", "128"))
+_filters = filter_cache.FilterCache(FILTER_CACHE_MB << 20)
+
+_results = collections.OrderedDict()
+_lock = threading.Lock()
+_latest_version = None
+_counters = {'hits': 0, 'misses': 0}
+
+
+def memoised(fn):
+    """Memoise fn(snapshot, *args) on the snapshot version and args"""
+    @functools.wraps(fn)
+    def wrapper(snapshot, *args):
+        global _latest_version
+        key = (fn.__name__, snapshot.version, args)
+        with _lock:
+            if key in _results:
+                _results.move_to_end(key)
+                _counters['hits'] += 1
+                return _results[key]
+        result = fn(snapshot, *args)
+        with _lock:
+            _counters['misses'] += 1
+            if _latest_version is not None and snapshot.version < _latest_version:
+                # Computed on a snapshot that has since been replaced; nobody will ask again
+                return result
+            if snapshot.version != _latest_version:
+                # A newer snapshot was swapped in; results of older ones are never asked for again
+                for stale in [k for k in _results if k[1] != snapshot.version]:
+                    del _results[stale]
+                _latest_version = snapshot.version
+            _results[key] = result
+            while len(_results) > MAX_RESULTS:
+                _results.popitem(last=False)
+        return result
+    return wrapper
+
+
+def stats():
+    """Hit-rate figures of the result cache"""
+    with _lock:
+        requests = _counters['hits'] + _counters['misses']
+        return dict(_counters, entries=len(_results),
+                    hit_rate=_counters['hits'] / requests if requests else 0.0)
+
+
+def filter_stats():
+    """Hit-rate and memory figures of the filter-result cache"""
+    return _filters.stats()
+
+
+def prepare(df, compact=False):
+    """(df, cube, index) of a freshly loaded customer table, for a shared_data.DataSnapshot
+
+    Names the segments, then pre-aggregates and indexes the filter columns;
+    done once per load. compact selects the customer_schema.compact layout.
+    """
+    if compact:
+        df = customer_schema.compact(df, marketing.CLUSTER_MAPPING)
+    else:
+        df['cluster_name'] = df['predicted_customer_segmentation'].map(marketing.CLUSTER_MAPPING)
+    return df, segment_cube.build_cube(df), bitmap_index.BitmapIndex(df, segment_cube.DIMENSIONS)
+
+
+def selection(segments, cities, areas):
+    """Canonical, hashable form of a sidebar selection (order does not matter)"""
+    return tuple(tuple(sorted(set(values))) for values in (segments, cities, areas))
+
+
+def _effective(snapshot, selection):
+    """Selection with None in the dimensions where every value is selected
+
+    Such dimensions do not filter anything, so they are dropped from the key:
+    those views share one filter-cache entry and skip that dimension's bitmaps.
+    """
+    complete = _complete_dimensions(snapshot)
+    return tuple(
+        None if col in complete and set(values) >= set(complete[col]) else values
+        for col, values in zip(segment_cube.DIMENSIONS, selection)
+    )
+
+
+def selected_row_set(snapshot, selection):
+    """filter_cache.RowSet of a selection from the snapshot's bitmap index, or None for every row"""
+    effective = _effective(snapshot, selection)
+    if effective == (None, None, None):
+        return None
+    return _filters.get(snapshot.version, effective,
+                        lambda: snapshot.index.rows(dict(zip(segment_cube.DIMENSIONS, effective))))
+
+
+def selected_rows(snapshot, selection):
+    """Customer rows matching a selection, via the shared filter-result cache"""
+    rows = selected_row_set(snapshot, selection)
+    return snapshot.df if rows is None else rows.take(snapshot.df)
+
+
+@memoised
+def selected_count(snapshot, selection):
+    """Number of customers matching a selection, from the popcount of its bitmap"""
+    effective = _effective(snapshot, selection)
+    if effective == (None, None, None):
+        return len(snapshot.df)
+    return snapshot.index.count(dict(zip(segment_cube.DIMENSIONS, effective)))
+
+
+@memoised
+def filter_options(snapshot):
+    """Segment names (in segment id order), cities and areas offered by the sidebar"""
+    df = snapshot.df
+    segments = sorted(df['predicted_customer_segmentation'].unique())
+    return {
+        'segments': [marketing.CLUSTER_MAPPING[s] for s in segments],
+        'cities': sorted(df['outlet_city'].unique()),
+        'areas': sorted(df['Area'].unique())
+    }
+
+
+@memoised
+def _complete_dimensions(snapshot):
+    """Values of each dimension without missing values (where selecting all filters nothing)"""
+    df = snapshot.df
+    return {col: set(df[col].unique()) for col in segment_cube.DIMENSIONS if df[col].notna().all()}
+
+
+@memoised
+def cells(snapshot, selection):
+    """Cube cells matching a selection"""
+    return segment_cube.select(snapshot.cube, *selection)
+
+
+@memoised
+def overall(snapshot, selection):
+    """Statistics of the whole selection as one row"""
+    return segment_cube.totals(cells(snapshot, selection))
+
+
+@memoised
+def kpis(snapshot, selection):
+    """Headline figures of the Cluster Summary cards"""
+    totals = overall(snapshot, selection)
+    return {
+        'total_customers': int(totals['rows']),
+        'avg_total_sales': segment_cube.mean(totals, 'total_sales'),
+        'total_revenue': totals['total_sales_sum'],
+        'active_cities': cells(snapshot, selection)['outlet_city'].nunique()
+    }
+
+
+@memoised
+def counts(snapshot, selection, dimension):
+    """Customers per value of a dimension, largest first"""
+    return segment_cube.counts(cells(snapshot, selection), dimension)
+
+
+@memoised
+def segment_stats(snapshot, selection):
+    """Rolled-up statistics per segment"""
+    return segment_cube.rollup(cells(snapshot, selection), 'cluster_name')
+
+
+@memoised
+def segment_averages(snapshot, selection):
+    """Average luxury, fresh and dry sales per segment"""
+    stats = segment_stats(snapshot, selection)
+    return pd.DataFrame({
+        col: segment_cube.mean(stats, col)
+        for col in ['luxury_sales', 'fresh_sales', 'dry_sales']
+    })
+
+
+@memoised
+def category_sales(snapshot, selection):
+    """Total sales per product category"""
+    totals = overall(snapshot, selection)
+    return {
+        'Luxury': totals['luxury_sales_sum'],
+        'Fresh': totals['fresh_sales_sum'],
+        'Dry': totals['dry_sales_sum']
+    }
+
+
+@memoised
+def sales_histogram(snapshot, selection, nbins):
+    """Binned total sales of the selected customers: (centers, widths, counts)"""
+    return chart_sampling.histogram(selected_rows(snapshot, selection)['total_sales'], nbins=nbins)
+
+
+@memoised
+def scatter_sample(snapshot, selection, budget):
+    """Stratified per-segment sample of the selected customers, and how many there are in total"""
+    rows = selected_rows(snapshot, selection)
+    return chart_sampling.stratified_sample(rows, 'cluster_name', budget), selected_count(snapshot, selection)
+
+
+@memoised
+def city_metrics(snapshot, selection):
+    """Customers, revenue and average sales per city, highest revenue first"""
+    city_stats = segment_cube.rollup(cells(snapshot, selection), 'outlet_city')
+    metrics = pd.DataFrame({
+        'Customer_Count': city_stats['customers'],
+        'Total_Revenue': city_stats['total_sales_sum'],
+        'Avg_Sales': segment_cube.mean(city_stats, 'total_sales'),
+        'Avg_Luxury': segment_cube.mean(city_stats, 'luxury_sales'),
+        'Avg_Fresh': segment_cube.mean(city_stats, 'fresh_sales'),
+        'Avg_Dry': segment_cube.mean(city_stats, 'dry_sales')
+    }).round(2)
+    return metrics.sort_values('Total_Revenue', ascending=False)
+
+
+@memoised
+def city_segment_matrix(snapshot, selection):
+    """Customers per (city, segment); cities as rows"""
+    by_city = segment_cube.rollup(cells(snapshot, selection), ['outlet_city', 'cluster_name'])
+    return by_city['rows'].unstack(fill_value=0)
+
+
+@memoised
+def segment_summary(snapshot, selection, top_k):
+    """Per-segment figures for the strategy boxes and expected responses"""
+    return segment_cube.segment_summary(cells(snapshot, selection), top_k,
+                                        marketing.RESPONSE_RATES, marketing.DEFAULT_RESPONSE_RATE)
+
+
+@memoised
+def campaign_projection(snapshot, selection):
+    """Reach and ROI projection of a campaign on the selection"""
+    total_customers = kpis(snapshot, selection)['total_customers']
+    estimated_reach = min(total_customers * marketing.REACH_RATE, total_customers)
+    current_avg = segment_cube.mean(overall(snapshot, selection), 'total_sales')
+    projected_avg = current_avg * marketing.ORDER_VALUE_UPLIFT
+    additional_revenue = (projected_avg - current_avg) * estimated_reach * marketing.DEFAULT_RESPONSE_RATE
+    return {
+        'estimated_reach': estimated_reach,
+        'current_avg': current_avg,
+        'projected_avg': projected_avg,
+        'additional_revenue': additional_revenue,
+        'suggested_budget': additional_revenue * marketing.BUDGET_SHARE
+    }
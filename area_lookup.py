@@ -0,0 +1,124 @@
+"""Versioned city -> Area lookup
+
+The notebooks split cities into Urban and Suburban by thresholding customers
+per city at the median of whatever frame is at hand, so Area shifts from one
+batch to the next. This builds the split once from a reference extract (the
+training data) and stores it with the outlet code -> city table, so scoring
+and the dashboard apply the same classification as a plain dict lookup.
+
+    python area_lookup.py traincsv.csv --output area_lookup.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import preprocessing
+import streaming_ingest
+
+LOOKUP_FILE = 'area_lookup.json'
+
+# Outlet codes in the scoring extracts (Deployment_NN.ipynb)
+OUTLET_CITY_MAP = {
+    1: 'Batticaloa',
+    2: 'Colombo',
+    3: 'Dehiwala-Mount Lavinia',
+    4: 'Anuradhapura',
+    5: 'Galle',
+    6: 'Gampaha',
+    7: 'Homagama',
+    8: 'Jaffna',
+    9: 'Kaduwela',
+    10: 'Kalmunai',
+    11: 'Kandy',
+    12: 'Katunayake',
+    13: 'Kelaniya',
+    14: 'Madawachiya',
+    15: 'Kotte',
+    16: 'Moratuwa',
+    17: 'Negombo',
+    18: 'Nuwara Eliya',
+    19: 'Panadura',
+    20: 'Peliyagoda',
+    21: 'Trincomalee',
+    22: 'Wattala'
+}
+
+
+class AreaLookup:
+    """City -> Area classification and outlet code -> city table, fixed at build time
+
+    version is a digest of both tables, so it only changes when a rebuild
+    actually reclassifies a city or renames an outlet.
+    """
+
+    def __init__(self, areas, outlet_cities=None, city_totals=None, source=None, created=None):
+        self.areas = dict(areas)
+        self.outlet_cities = {int(code): city for code, city in (outlet_cities or OUTLET_CITY_MAP).items()}
+        self.city_totals = dict(city_totals or {})
+        self.source = source
+        self.created = created
+        content = json.dumps([sorted(self.areas.items()), sorted(self.outlet_cities.items())])
+        self.version = hashlib.sha256(content.encode()).hexdigest()[:12]
+
+    def area_of(self, cities):
+        """Area of each city in a Series (NaN for cities not in the lookup)"""
+        return cities.map(self.areas)
+
+    def save(self, path):
+        """Atomically write the lookup as JSON"""
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                'version': self.version,
+                'created': self.created,
+                'source': self.source,
+                'areas': self.areas,
+                'outlet_cities': self.outlet_cities,
+                'city_totals': self.city_totals
+            }, f, indent=2)
+        os.replace(tmp, path)
+
+
+def from_city_totals(city_totals, outlet_cities=None, source=None):
+    """Build a lookup from customers per city, split at the median like the notebooks"""
+    city_totals = city_totals.astype('int64')
+    return AreaLookup(preprocessing.area_mapping(city_totals), outlet_cities,
+                      city_totals.to_dict(), source, time.time())
+
+
+def load(path):
+    """Load a saved lookup (None if the file does not exist)"""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    return AreaLookup(data['areas'], data['outlet_cities'], data.get('city_totals'),
+                      data.get('source'), data.get('created'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the city -> Area lookup from a reference extract")
+    parser.add_argument('inputs', nargs='+', help="reference extracts (raw or cleaned, e.g. traincsv.csv)")
+    parser.add_argument('--output', default=LOOKUP_FILE)
+    parser.add_argument('--chunk-size', type=int, default=500_000, help="rows read per chunk")
+    args = parser.parse_args(argv)
+
+    # Same row filters and spelling fixes as cleaning, one chunk at a time
+    city_totals = streaming_ingest.gather_stats(args.inputs, args.chunk_size).city_totals
+
+    # Extracts with outlet codes count towards the named city
+    names = {str(code): city for code, city in OUTLET_CITY_MAP.items()}
+    city_totals = city_totals.groupby(city_totals.index.map(lambda c: names.get(c, c))).sum()
+
+    lookup = from_city_totals(city_totals, source=args.inputs)
+    lookup.save(args.output)
+    urban = sorted(city for city, area in lookup.areas.items() if area == 'Urban')
+    print(f"✅ Area lookup {lookup.version}: {len(urban)} Urban and {len(lookup.areas) - len(urban)} "
+          f"Suburban cities. File saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Score customers into segments in fixed-size chunks
+
+Streaming version of Deployment_NN.ipynb: reads the cleaned test extract in
+chunks, applies the scaler saved during training, predicts in batches and
+writes predicted_customer_segmentations.csv incrementally. With --workers,
+chunks are scored concurrently by a process pool and written in input order.
+With --incremental, only customers whose features changed since the last run
+are scored and the rest are carried over from the previous output. With
+--cache, predictions are memoised per distinct feature vector across runs.
+Area comes from the lookup built by area_lookup.py when there is one, so it
+is the same in every run. --model-kind scores with any model family loaded
+by model_serving.py instead of the NN.
+
+    python batch_scoring.py --input cleaned_test.csv --model finalized_model.sav --scaler scaler.sav --workers 8
+"""
+import argparse
+import collections
+import multiprocessing
+import os
+import sys
+import time
+
+import pandas as pd
+
+import area_lookup
+import fingerprints
+import model_serving
+import prediction_cache
+import preprocessing
+
+FEATURES = model_serving.FEATURES
+SALES_FEATURES = ['luxury_sales', 'fresh_sales', 'dry_sales']
+FINGERPRINT_SUFFIX = '.fingerprints.arrow'
+
+
+def predict_features(model, features, batch_size):
+    """Segment ids 1..6 of raw feature rows, from a model_serving.SegmentModel"""
+    segments, _ = model.predict_segments(features, batch_size)
+    return segments
+
+
+def score_chunk(chunk, segments, outlet_cities=area_lookup.OUTLET_CITY_MAP):
+    """Build the dashboard's output columns for one scored chunk"""
+    return pd.DataFrame({
+        'Customer_ID': chunk['Customer_ID'].to_numpy(),
+        'outlet_city': chunk['outlet_city'].map(outlet_cities).to_numpy(),
+        'luxury_sales': chunk['luxury_sales'].to_numpy(),
+        'fresh_sales': chunk['fresh_sales'].to_numpy(),
+        'dry_sales': chunk['dry_sales'].to_numpy(),
+        'predicted_customer_segmentation': segments,
+        'total_sales': (chunk['luxury_sales'] + chunk['fresh_sales'] + chunk['dry_sales']).to_numpy()
+    })
+
+
+# Model and scaler of a pool worker, loaded once by _init_worker
+_worker = {}
+
+
+def _init_worker(model_kind, model_path, scaler_path, batch_size):
+    _worker['model'] = model_serving.load(model_kind, model_path, scaler_path)
+    _worker['batch_size'] = batch_size
+
+
+def _predict_in_worker(features):
+    return predict_features(_worker['model'], features, _worker['batch_size'])
+
+
+def _lookup(chunk, cache):
+    """Return the cache lookup (if any) and the feature rows the model still has to predict"""
+    if cache is None:
+        return None, chunk[FEATURES]
+    pending = cache.lookup(chunk[FEATURES])
+    return pending, pending.missing_features
+
+
+def _finish(chunk, pending, predicted, cache, outlet_cities):
+    segments = predicted if cache is None else cache.complete(pending, predicted)
+    return score_chunk(chunk, segments, outlet_cities)
+
+
+def scored_chunks(chunks, model_path, scaler_path, batch_size, workers=1, cache=None,
+                  outlet_cities=area_lookup.OUTLET_CITY_MAP, model_kind='nn'):
+    """Score chunks, concurrently when workers > 1, yielding them in input order
+
+    The prediction cache stays in this process; only cache misses are sent
+    to the model or the worker pool.
+    """
+    if workers <= 1:
+        model = model_serving.load(model_kind, model_path, scaler_path)
+        for chunk in chunks:
+            pending, features = _lookup(chunk, cache)
+            predicted = predict_features(model, features, batch_size)
+            yield _finish(chunk, pending, predicted, cache, outlet_cities)
+        return
+
+    # spawn so workers never inherit a half-initialised ML runtime from the parent
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(workers, initializer=_init_worker, initargs=(model_kind, model_path, scaler_path, batch_size)) as pool:
+        # Keep a bounded number of chunks in flight so memory stays flat
+        in_flight = collections.deque()
+        for chunk in chunks:
+            pending, features = _lookup(chunk, cache)
+            in_flight.append((chunk, pending, pool.apply_async(_predict_in_worker, (features,))))
+            if len(in_flight) >= 2 * workers:
+                chunk, pending, result = in_flight.popleft()
+                yield _finish(chunk, pending, result.get(), cache, outlet_cities)
+        while in_flight:
+            chunk, pending, result = in_flight.popleft()
+            yield _finish(chunk, pending, result.get(), cache, outlet_cities)
+
+
+def attach_area(scored, area_map):
+    """Add Area and drop rows without a city or area"""
+    scored = scored.assign(Area=scored['outlet_city'].map(area_map))
+    return scored.dropna(subset=['outlet_city', 'Area'])
+
+
+def add_area(scored_path, output, area_map, chunk_size):
+    """Second pass: attach Area once the customers per city are known"""
+    first = True
+    for chunk in pd.read_csv(scored_path, chunksize=chunk_size):
+        attach_area(chunk, area_map).to_csv(output, mode='w' if first else 'a', header=first, index=False)
+        first = False
+
+
+def score_file(input_path, output, model_path, scaler_path, chunk_size, batch_size, workers=1,
+               incremental=False, cache=None, lookup=None, log=sys.stderr, model_kind='nn'):
+    """Score input_path into output; returns the number of rows scored
+
+    In incremental mode customers whose features and model artifacts are
+    unchanged since the previous run keep their previous prediction. With an
+    area_lookup.AreaLookup, outlet codes and Area come from the lookup and
+    the output is written in a single pass; without one, Area is derived
+    from this run's customers per city, as in Deployment_NN.ipynb.
+    scaler_path may be None for model kinds trained on unscaled features.
+    """
+    scored_path = output + '.scored.tmp'
+    fingerprint_path = output + FINGERPRINT_SUFFIX
+    digest = fingerprints.artifact_digest(*[path for path in (model_path, scaler_path) if path])
+    previous = None
+    if incremental and os.path.exists(output):
+        previous = fingerprints.load_fingerprints(fingerprint_path, digest)
+        if previous is None:
+            print("No fingerprints for these artifacts, scoring every customer", file=log)
+    tracker = fingerprints.ChangeTracker(previous, FEATURES)
+
+    outlet_cities = area_lookup.OUTLET_CITY_MAP if lookup is None else lookup.outlet_cities
+    target = scored_path if lookup is None else output + '.tmp'
+    city_totals = pd.Series(dtype='int64')
+    written = dropped = 0
+
+    def append(scored):
+        nonlocal city_totals, written, dropped
+        first = written == 0
+        written += len(scored)
+        if lookup is not None:
+            kept = attach_area(scored, lookup.areas)
+            dropped += len(scored) - len(kept)
+            scored = kept
+        else:
+            city_totals = city_totals.add(scored['outlet_city'].value_counts(), fill_value=0)
+        scored.to_csv(target, mode='w' if first else 'a', header=first, index=False)
+
+    rows = 0
+    start = time.perf_counter()
+    try:
+        chunks = (tracker.filter(chunk) for chunk in pd.read_csv(input_path, chunksize=chunk_size))
+        chunks = (chunk for chunk in chunks if len(chunk))
+        for scored in scored_chunks(chunks, model_path, scaler_path, batch_size, workers, cache,
+                                    outlet_cities, model_kind):
+            append(scored)
+            rows += len(scored)
+            elapsed = time.perf_counter() - start
+            print(f"Scored {rows:,} rows ({rows / elapsed:,.0f} rows/s)", file=log)
+
+        if previous is not None:
+            # Carry over unchanged customers; deleted ones are simply not copied
+            unchanged = tracker.unchanged_ids()
+            for prior in pd.read_csv(output, chunksize=chunk_size):
+                append(prior[prior['Customer_ID'].isin(unchanged)].drop(columns='Area'))
+            print(f"{tracker.new:,} new, {tracker.changed:,} changed, {tracker.deleted:,} deleted, "
+                  f"{len(unchanged):,} unchanged customers", file=log)
+
+        if written == 0:
+            raise ValueError(f"No rows to score in {input_path}")
+
+        if dropped:
+            print(f"Dropped {dropped:,} rows without a city or with a city missing from the area lookup", file=log)
+        if lookup is None:
+            # Area needs the customer count of every city, so it is added afterwards
+            add_area(scored_path, output + '.tmp', preprocessing.area_mapping(city_totals), chunk_size)
+        os.replace(output + '.tmp', output)
+        tracker.save(fingerprint_path, digest)
+    finally:
+        for path in (scored_path, output + '.tmp'):
+            if os.path.exists(path):
+                os.remove(path)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score customers into segments in chunks")
+    parser.add_argument('--input', default='cleaned_test.csv', help="cleaned customer extract")
+    parser.add_argument('--output', default='predicted_customer_segmentations.csv')
+    parser.add_argument('--model', default='finalized_model.sav', help="pickled or joblib segment model")
+    parser.add_argument('--model-kind', default='nn', choices=list(model_serving.MODEL_KINDS),
+                        help="model family of --model (only nn uses --scaler)")
+    parser.add_argument('--scaler', default='scaler.sav', help="pickled StandardScaler fitted on training data")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="rows read per chunk")
+    parser.add_argument('--batch-size', type=int, default=8192, help="rows per model.predict call")
+    parser.add_argument('--workers', type=int, default=1, help="scoring processes (default 1, no pool)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only score customers whose features changed since the last run")
+    parser.add_argument('--cache', help="prediction cache file, reused across runs")
+    parser.add_argument('--cache-size', type=int, default=1_000_000, help="max cached feature vectors")
+    parser.add_argument('--quantize', type=float, help="round sales to this step before cache lookup")
+    parser.add_argument('--area-lookup', default=area_lookup.LOOKUP_FILE,
+                        help="city -> Area lookup built by area_lookup.py")
+    args = parser.parse_args(argv)
+    scaler = args.scaler if model_serving.MODEL_KINDS[args.model_kind] else None
+
+    lookup = area_lookup.load(args.area_lookup)
+    if lookup is None:
+        print(f"No area lookup at {args.area_lookup}, deriving Area from this run's city counts", file=sys.stderr)
+    else:
+        print(f"Using area lookup {lookup.version} from {args.area_lookup}", file=sys.stderr)
+
+    cache = None
+    if args.cache:
+        digest = fingerprints.artifact_digest(*[path for path in (args.model, scaler) if path])
+        cache = prediction_cache.PredictionCache(args.cache_size, args.quantize, SALES_FEATURES)
+        cache.load(args.cache, FEATURES, digest)
+
+    start = time.perf_counter()
+    rows = score_file(args.input, args.output, args.model, scaler, args.chunk_size, args.batch_size,
+                      args.workers, args.incremental, cache, lookup, model_kind=args.model_kind)
+    elapsed = time.perf_counter() - start
+
+    if cache is not None:
+        cache.save(args.cache, FEATURES, digest)
+        stats = cache.stats()
+        print(f"Prediction cache: {stats['hit_rate']:.1%} hit rate, {stats['predicted']:,} of "
+              f"{stats['rows']:,} rows sent to the model, {stats['entries']:,} entries")
+    print(f"✅ Scored {rows:,} customers in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s). "
+          f"File saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
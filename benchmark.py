@@ -0,0 +1,329 @@
+"""Benchmark the dashboard and scoring paths on synthetic customer tables
+
+Runs offline on local files written by synthetic_data.py. Every (path, size)
+case runs in a fresh process, so the peak memory reported is that case's own.
+Save a run as a baseline and compare later runs against it to catch
+regressions.
+
+    python benchmark.py --sizes 10k,100k,1M --save-baseline bench_baseline.json
+    python benchmark.py --sizes 10k,100k,1M --baseline bench_baseline.json
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import pickle
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+import numpy as np
+import pandas as pd
+
+import analytics
+import batch_scoring
+import shared_data
+import snapshot_store
+import synthetic_data
+
+# Points in the dashboard's scatter plot, read from the same setting
+SCATTER_MAX_POINTS = int(os.environ.get("SCATTER_MAX_POINTS", "5000"))
+SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1M' -> 1000000"""
+    text = text.strip().lower()
+    if text[-1] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+def _timed(fn, repeat):
+    """Best wall-clock time of repeat calls, and the last result"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def selections(df):
+    """Typical sidebar selections: everything, a few segments, half the cities, one area"""
+    names = sorted(df['cluster_name'].dropna().unique())
+    cities = sorted(df['outlet_city'].dropna().unique())
+    areas = sorted(df['Area'].dropna().unique())
+    return [analytics.selection(*chosen) for chosen in [
+        (names, cities, areas),
+        (names[:3], cities, areas),
+        (names, cities[:len(cities) // 2], areas),
+        (names, cities, areas[:1])
+    ]]
+
+
+def sidebar(service, snapshot, selection):
+    """What a dashboard rerun computes before its view: filter options, KPIs and the cache readout"""
+    analytics.filter_options(snapshot)
+    analytics.kpis(snapshot, selection)
+    service.stats()
+    analytics.stats()
+    analytics.filter_stats()
+
+
+def views(snapshot, selection):
+    """The analytics calls of all four dashboard views"""
+    analytics.counts(snapshot, selection, 'cluster_name')
+    analytics.counts(snapshot, selection, 'Area')
+    analytics.segment_stats(snapshot, selection)
+    analytics.category_sales(snapshot, selection)
+    analytics.segment_averages(snapshot, selection)
+    analytics.sales_histogram(snapshot, selection, 30)
+    analytics.scatter_sample(snapshot, selection, SCATTER_MAX_POINTS)
+    analytics.city_metrics(snapshot, selection)
+    analytics.city_segment_matrix(snapshot, selection)
+    analytics.segment_summary(snapshot, selection, 3)
+    analytics.campaign_projection(snapshot, selection)
+
+
+def _timed_cold(fresh, fn, repeat):
+    """Best wall-clock time of fn(fresh()) over repeat calls; fresh() itself is not timed"""
+    best = float('inf')
+    for _ in range(repeat):
+        state = fresh()
+        start = time.perf_counter()
+        fn(state)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def dashboard_case(csv_path, workdir, repeat, compact=False):
+    """Stage timings of the dashboard's load, filter and view path
+
+    Goes through the same shared_data and analytics calls as a rerun. filter
+    and views are timed on a new snapshot, with nothing memoised yet, and
+    rerun repeats both with every result memoised, like an unchanged rerun.
+    """
+    stages = {}
+
+    def parse():
+        directory = tempfile.mkdtemp(dir=workdir)
+        return directory, snapshot_store.refresh(csv_path, directory)[0]
+
+    stages['parse'], (directory, df) = _timed(parse, repeat)
+    stages['load'], df = _timed(lambda: snapshot_store.load_snapshot(directory), repeat)
+    stages['prepare'], parts = _timed(lambda: analytics.prepare(df.copy(deep=False), compact), repeat)
+    chosen = selections(parts[0])
+
+    def fresh():
+        # Snapshot versions are unique to the process, so a new service starts with nothing memoised
+        service = shared_data.SharedDataService(lambda current: parts, ttl=float('inf'))
+        return service, service.get()
+
+    def filter_all(state):
+        for selection in chosen:
+            sidebar(*state, selection)
+
+    def view_all(state):
+        for selection in chosen:
+            views(state[1], selection)
+
+    def after_sidebar():
+        state = fresh()
+        filter_all(state)
+        return state
+
+    def rerun(state):
+        filter_all(state)
+        view_all(state)
+
+    stages['filter'] = _timed_cold(fresh, filter_all, repeat)
+    stages['views'] = _timed_cold(after_sidebar, view_all, repeat)
+    state = after_sidebar()
+    rerun(state)
+    stages['rerun'], _ = _timed(lambda: rerun(state), repeat)
+
+    # Per-selection stages are reported per selection, like one rerun
+    for stage in ('filter', 'views', 'rerun'):
+        stages[stage] /= len(chosen)
+    return stages
+
+
+def scoring_case(csv_path, workdir, repeat, model_path, scaler_path, workers=1,
+                 chunk_size=100_000, batch_size=8192):
+    """Wall-clock time of batch_scoring.score_file on the scoring extract"""
+    output = os.path.join(workdir, 'scored.csv')
+    seconds, _ = _timed(lambda: batch_scoring.score_file(
+        csv_path, output, model_path, scaler_path, chunk_size, batch_size, workers, log=io.StringIO()
+    ), repeat)
+    return {'score': seconds}
+
+
+def generate(case):
+    """Write the synthetic inputs (and stand-in model) for one size"""
+    rows, workdir, segment_skew, city_skew, seed = case
+    df = synthetic_data.customers(rows, segment_skew, city_skew, seed)
+    synthetic_data.write_csv(df, os.path.join(workdir, 'customers.csv'))
+    synthetic_data.write_csv(synthetic_data.scoring_extract(df), os.path.join(workdir, 'scoring.csv'))
+
+    # Fitting on a sample keeps generation cheap at 10M rows
+    sample = df.sample(min(rows, 100_000), random_state=seed)
+    model, scaler = synthetic_data.stand_in_artifacts(sample, batch_scoring.FEATURES)
+    for name, artifact in (('model.sav', model), ('scaler.sav', scaler)):
+        with open(os.path.join(workdir, name), 'wb') as f:
+            pickle.dump(artifact, f)
+
+
+def run_case(case):
+    """Run one (path, size) case; executed in a fresh process"""
+    path, rows, workdir, options = case
+    start = time.perf_counter()
+    if path == 'dashboard':
+        stages = dashboard_case(os.path.join(workdir, 'customers.csv'), workdir, options['repeat'],
+                                options['compact'])
+    else:
+        stages = scoring_case(os.path.join(workdir, 'scoring.csv'), workdir, options['repeat'],
+                              options['model'] or os.path.join(workdir, 'model.sav'),
+                              options['scaler'] or os.path.join(workdir, 'scaler.sav'),
+                              options['workers'])
+    return {
+        'path': path,
+        'rows': rows,
+        'stages': {stage: {'seconds': seconds, 'rows_per_s': rows / seconds if seconds else None}
+                   for stage, seconds in stages.items()},
+        'peak_rss_mb': shared_data.peak_rss_mb(),
+        'wall_seconds': time.perf_counter() - start
+    }
+
+
+def _child(conn, fn, arg):
+    try:
+        conn.send((True, fn(arg)))
+    except BaseException:
+        conn.send((False, traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+def in_fresh_process(context, fn, arg):
+    """fn(arg) in a new process, which may start its own pool (unlike a Pool worker)"""
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_child, args=(sender, fn, arg))
+    process.start()
+    sender.close()
+    try:
+        ok, result = receiver.recv()
+    except EOFError:
+        ok, result = False, f"process exited with code {process.exitcode} without a result"
+    finally:
+        receiver.close()
+        process.join()
+    if not ok:
+        raise RuntimeError(f"Benchmark case failed:\n{result}")
+    return result
+
+
+def _key(result, stage):
+    return f"{result['path']}/{result['rows']}/{stage}"
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing stages (and peak memory) slower than the baseline by more than tolerance"""
+    previous = {}
+    for result in baseline['results']:
+        for stage, figures in result['stages'].items():
+            previous[_key(result, stage)] = figures['seconds']
+        previous[_key(result, 'peak_rss_mb')] = result['peak_rss_mb']
+
+    regressions = []
+    for result in results:
+        figures = {stage: f['seconds'] for stage, f in result['stages'].items()}
+        figures['peak_rss_mb'] = result['peak_rss_mb']
+        for stage, value in figures.items():
+            before = previous.get(_key(result, stage))
+            if before and value and value > before * (1 + tolerance):
+                regressions.append(f"{_key(result, stage)}: {before:.4g} -> {value:.4g} "
+                                   f"({value / before:.2f}x)")
+    return regressions
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard and scoring paths")
+    parser.add_argument('--sizes', default='10k,100k,1M', help="comma-separated row counts (10k, 1M, ...)")
+    parser.add_argument('--paths', default='dashboard,scoring', help="dashboard and/or scoring")
+    parser.add_argument('--segment-skew', type=float, default=0.5, help="Zipf exponent over segments")
+    parser.add_argument('--city-skew', type=float, default=0.8, help="Zipf exponent over cities")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage; the best is reported")
+    parser.add_argument('--compact', action='store_true', help="use the COMPACT_SCHEMA table layout")
+    parser.add_argument('--model', help="real model artifact (default: a synthetic stand-in)")
+    parser.add_argument('--scaler', help="real scaler artifact (default: a synthetic stand-in)")
+    parser.add_argument('--workers', type=int, default=1, help="scoring processes")
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--baseline', help="compare against a saved baseline")
+    parser.add_argument('--save-baseline', help="save this run as a baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    paths = [path.strip() for path in args.paths.split(',')]
+    options = {'repeat': args.repeat, 'compact': args.compact, 'model': args.model,
+               'scaler': args.scaler, 'workers': args.workers}
+
+    root = tempfile.mkdtemp(prefix='octave-bench-')
+    results = []
+    try:
+        workdirs = {rows: os.path.join(root, str(rows)) for rows in sizes}
+        for workdir in workdirs.values():
+            os.makedirs(workdir)
+
+        # One fresh process per task so each case's peak RSS is its own. Plain
+        # (non-daemonic) processes, so scoring with --workers can start its pool
+        context = multiprocessing.get_context('spawn')
+        for rows in sizes:
+            in_fresh_process(context, generate, (rows, workdirs[rows], args.segment_skew, args.city_skew, args.seed))
+        for rows in sizes:
+            for path in paths:
+                result = in_fresh_process(context, run_case, (path, rows, workdirs[rows], options))
+                results.append(result)
+                for stage, figures in result['stages'].items():
+                    print(f"{result['path']:<10} {result['rows']:>12,} {stage:<10} {figures['seconds']:>10.4f} s "
+                          f"{figures['rows_per_s'] or 0:>14,.0f} rows/s")
+                print(f"{result['path']:<10} {result['rows']:>12,} {'peak RSS':<10} "
+                      f"{result['peak_rss_mb'] or 0:>10,.1f} MB")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {'created': time.time(), 'environment': environment(), 'settings': vars(args), 'results': results}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
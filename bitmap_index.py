@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+import filter_cache
+
+# Set bits per byte value, for numpy versions without bitwise_count
+_BYTE_COUNTS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def popcount(words):
+    """Number of set bits in an array of words"""
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum())
+    return int(_BYTE_COUNTS[words.view(np.uint8)].sum())
+
+
+def _pack(mask):
+    """Little-endian packed bitmap as uint64 words, so set operations run 64 rows at a time"""
+    bits = np.packbits(mask, bitorder='little')
+    padded = np.zeros(-(-len(bits) // 8) * 8, dtype=np.uint8)
+    padded[:len(bits)] = bits
+    return padded.view(np.uint64)
+
+
+class BitmapIndex:
+    """One bitmap per distinct value of each filter dimension, built once per snapshot
+
+    A selection is answered by OR-ing the bitmaps of the selected values
+    within a dimension and AND-ing across dimensions, 64 rows per word
+    operation, and counted by popcount without materialising any rows.
+    """
+
+    def __init__(self, df, dimensions):
+        self.size = len(df)
+        self.bitmaps = {}
+        self.valid = {}
+        for dim in dimensions:
+            codes, values = pd.factorize(df[dim])
+            self.bitmaps[dim] = {value: _pack(codes == code) for code, value in enumerate(values)}
+            # Rows with a value in this dimension (missing values never match a selection)
+            self.valid[dim] = _pack(codes >= 0)
+
+    @property
+    def nbytes(self):
+        return sum(words.nbytes for bitmaps in self.bitmaps.values() for words in bitmaps.values()) + \
+            sum(words.nbytes for words in self.valid.values())
+
+    def _dimension(self, dim, values):
+        bitmaps = self.bitmaps[dim]
+        selected = set(values)
+        wanted = [words for value, words in bitmaps.items() if value in selected]
+        unwanted = [words for value, words in bitmaps.items() if value not in selected]
+        # OR whichever side is smaller; the complement is taken within the valid rows
+        if len(unwanted) < len(wanted):
+            words = self.valid[dim].copy()
+            for other in unwanted:
+                words &= ~other
+            return words
+        words = np.zeros_like(self.valid[dim])
+        for other in wanted:
+            words |= other
+        return words
+
+    def query(self, selection):
+        """Bitmap words of the rows matching a (dimension -> values or None) selection"""
+        words = None
+        for dim, values in selection.items():
+            if values is None:
+                continue
+            matched = self._dimension(dim, values)
+            words = matched if words is None else words & matched
+        if words is None:
+            words = np.zeros(-(-self.size // 64), dtype=np.uint64)
+            words[:] = np.uint64(0xFFFFFFFFFFFFFFFF)
+            if self.size % 64:
+                words[-1] = np.uint64((1 << (self.size % 64)) - 1)
+        return words
+
+    def count(self, selection):
+        """Rows matching a selection, from the popcount of its bitmap"""
+        return popcount(self.query(selection))
+
+    def rows(self, selection):
+        """filter_cache.RowSet of the rows matching a selection"""
+        words = self.query(selection)
+        return filter_cache.RowSet.from_bits(words, self.size, popcount(words))
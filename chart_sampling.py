@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+
+def histogram(values, nbins=30):
+    """Bin values server-side; returns (bin centers, bin widths, counts)"""
+    values = np.asarray(values, dtype='float64')
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return np.array([]), np.array([]), np.array([], dtype='int64')
+    counts, edges = np.histogram(values, bins=nbins)
+    return (edges[:-1] + edges[1:]) / 2, np.diff(edges), counts
+
+
+def stratified_mask(keys, budget, seed=0):
+    """Boolean mask picking about `budget` of the keyed rows, keeping every key's share
+
+    Each key keeps at least one row so small segments stay visible; rows
+    with a missing key are never picked. Works on integer codes, so object
+    string keys are hashed once instead of grouped row by row.
+    """
+    codes, _ = pd.factorize(keys)
+    sizes = np.bincount(codes[codes >= 0])
+    quota = np.maximum(1, np.floor(sizes * budget / len(codes))).astype('int64')
+
+    # Each key keeps its `quota` rows of lowest random priority; partitioning
+    # within a key is linear, unlike sorting all rows
+    priority = np.random.default_rng(seed).random(len(codes))
+    by_key = np.argsort(codes, kind='stable')
+    starts = np.count_nonzero(codes < 0) + np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    mask = np.zeros(len(codes), dtype=bool)
+    for start, size, keep in zip(starts, sizes, quota):
+        rows = by_key[start:start + size]
+        if keep < size:
+            rows = rows[np.argpartition(priority[rows], keep - 1)[:keep]]
+        mask[rows] = True
+    return mask
+
+
+def stratified_sample(df, by, budget, seed=0):
+    """Sample about `budget` rows, keeping every group's share of the rows
+
+    Each group keeps at least one row so small segments stay visible.
+    """
+    if len(df) <= budget:
+        return df
+    return df[stratified_mask(df[by], budget, seed)]
@@ -0,0 +1,53 @@
+import pandas as pd
+import pyarrow as pa
+
+# Columns stored as dictionary codes and as float32 in compact mode
+CATEGORY_COLS = ['outlet_city', 'Area']
+SALES_COLS = ['luxury_sales', 'fresh_sales', 'dry_sales', 'total_sales']
+
+
+def segment_names(segments, mapping):
+    """Categorical segment names built from integer codes, without per-row strings"""
+    ids = pd.Index(list(mapping))
+    codes = ids.get_indexer(segments)  # -1 (missing) for unknown segments
+    return pd.Categorical.from_codes(codes, categories=[mapping[i] for i in ids])
+
+
+def plain_schema(schema):
+    """Arrow schema with dictionary (categorical) columns as plain strings
+
+    Used for every CSV/Parquet the repo writes, so compact and plain tables
+    produce the same files and chunks of one export share one schema.
+    """
+    return pa.schema([pa.field(f.name, pa.string() if pa.types.is_dictionary(f.type) else f.type) for f in schema])
+
+
+def _compact_ids(ids):
+    numeric = pd.to_numeric(ids, errors='coerce')
+    if numeric.notna().all() and (numeric % 1 == 0).all():
+        return pd.to_numeric(numeric.astype('int64'), downcast='integer')
+    # Non-numeric IDs are dictionary-encoded instead
+    return ids.astype('category')
+
+
+def compact(df, mapping):
+    """Convert the customer table to the compact schema in place
+
+    City, area and segment name become categoricals, customer IDs and segment
+    ids become the smallest integer type that fits and sales become float32.
+    """
+    for col in CATEGORY_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in SALES_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype('float32')
+
+    if 'Customer_ID' in df.columns:
+        df['Customer_ID'] = _compact_ids(df['Customer_ID'])
+
+    segments = df['predicted_customer_segmentation']
+    if segments.notna().all():
+        df['predicted_customer_segmentation'] = pd.to_numeric(segments, downcast='integer')
+    df['cluster_name'] = segment_names(df['predicted_customer_segmentation'], mapping)
+    return df
@@ -0,0 +1,100 @@
+"""Chunked CSV and Parquet exports of the selected customers and city metrics
+
+Customer rows are taken from the selection's cached bitmap row set
+CHUNK_ROWS at a time and written with Arrow's streaming writers, so
+writing an export never copies the whole selection into one DataFrame:
+
+    export.customers(snapshot, selection, 'audience.parquet', 'parquet')
+"""
+import tempfile
+
+import pyarrow as pa
+
+import analytics
+import customer_schema
+import marketing
+
+CHUNK_ROWS = 100_000
+FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+PRIMARY_STRATEGY = {name: strategy['primary'] for name, strategy in marketing.MARKETING_STRATEGIES.items()}
+CHANNELS = {name: ', '.join(strategy['channels']) for name, strategy in marketing.MARKETING_STRATEGIES.items()}
+
+
+def _writer(sink, schema, fmt):
+    # Writer modules are imported on the first export, not when the dashboard starts
+    if fmt == 'csv':
+        import pyarrow.csv as pacsv
+        return pacsv.CSVWriter(sink, schema)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(sink, schema)
+    raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+
+def write_frames(frames, sink, fmt, empty):
+    """Write frames one at a time to sink (a path or binary file); empty gives the columns if there are none"""
+    writer = None
+    rows = 0
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                schema = customer_schema.plain_schema(table.schema)
+                writer = _writer(sink, schema, fmt)
+            writer.write_table(table.cast(schema))
+            rows += len(frame)
+        if writer is None:
+            schema = customer_schema.plain_schema(pa.Schema.from_pandas(empty, preserve_index=False))
+            writer = _writer(sink, schema, fmt)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def with_strategy(frame):
+    """Customer rows with their segment's primary strategy and channels"""
+    # Mapped once per segment rather than once per row
+    names = frame['cluster_name'].astype('category')
+    return frame.assign(strategy=names.map(PRIMARY_STRATEGY), channels=names.map(CHANNELS))
+
+
+def customer_chunks(snapshot, selection, chunk_rows=CHUNK_ROWS):
+    """Selected customers with their strategy, at most chunk_rows at a time"""
+    df = snapshot.df
+    rows = analytics.selected_row_set(snapshot, selection)
+    if rows is None:
+        for start in range(0, len(df), chunk_rows):
+            yield with_strategy(df.iloc[start:start + chunk_rows])
+    else:
+        for positions in rows.chunks(chunk_rows):
+            yield with_strategy(df.iloc[positions])
+
+
+def customers(snapshot, selection, sink, fmt='csv', chunk_rows=CHUNK_ROWS):
+    """Write the selected customers and their strategy to sink; returns the number of rows"""
+    return write_frames(customer_chunks(snapshot, selection, chunk_rows), sink, fmt,
+                        with_strategy(snapshot.df.iloc[:0]))
+
+
+def city_metrics(snapshot, selection, sink, fmt='csv'):
+    """Write the city metrics table of the selection to sink; returns the number of rows"""
+    metrics = analytics.city_metrics(snapshot, selection).reset_index()
+    return write_frames([metrics], sink, fmt, metrics)
+
+
+def download(write, snapshot, selection, fmt):
+    """Deferred data for st.download_button: nothing is written until the button is clicked
+
+    The export is written to an anonymous temporary file and the file handle
+    is returned. Streamlit reads that file into bytes and keeps them in its
+    media store, so serving an export peaks at one copy of the serialised
+    file in memory. Callables as data need Streamlit 1.52.
+    """
+    def generate():
+        sink = tempfile.TemporaryFile(buffering=0)
+        write(snapshot, selection, sink, fmt)
+        sink.seek(0)
+        return sink
+    return generate
@@ -0,0 +1,140 @@
+import collections
+import threading
+
+import numpy as np
+
+
+class RowSet:
+    """Rows of a table selected by a filter, without copying the table
+
+    Stored as row positions or as a bitmap, whichever is smaller: sparse
+    selections keep positions, dense ones one bit per table row.
+    """
+    __slots__ = ('size', 'count', 'positions', 'bits')
+
+    def __init__(self, size, count, positions=None, bits=None):
+        self.size = size
+        self.count = count
+        self.positions = positions
+        self.bits = bits
+
+    @staticmethod
+    def _sparse(count, size):
+        return count * 4 <= size // 8 + 1
+
+    @classmethod
+    def from_mask(cls, mask):
+        mask = np.asarray(mask, dtype=bool)
+        count = int(mask.sum())
+        if cls._sparse(count, len(mask)):
+            return cls(len(mask), count, positions=_positions(np.flatnonzero(mask), len(mask)))
+        return cls(len(mask), count, bits=np.packbits(mask, bitorder='little'))
+
+    @classmethod
+    def from_bits(cls, bits, size, count):
+        """From a little-endian packed bitmap of size rows with count bits set"""
+        bits = bits.view(np.uint8)
+        if cls._sparse(count, size):
+            return cls(size, count, positions=_positions(np.flatnonzero(cls._unpack(bits, size)), size))
+        return cls(size, count, bits=bits)
+
+    @staticmethod
+    def _unpack(bits, size):
+        return np.unpackbits(bits, count=size, bitorder='little').view(bool)
+
+    @property
+    def nbytes(self):
+        return (self.positions if self.bits is None else self.bits).nbytes
+
+    def mask(self):
+        if self.bits is not None:
+            return self._unpack(self.bits, self.size)
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.positions] = True
+        return mask
+
+    def take(self, df):
+        """The selected rows of df (the table the mask was built on)"""
+        if self.bits is None:
+            return df.iloc[self.positions]
+        return df[self.mask()]
+
+    def chunks(self, chunk_rows):
+        """Selected row positions in ascending order, at most chunk_rows at a time"""
+        if self.bits is None:
+            for start in range(0, self.count, chunk_rows):
+                yield self.positions[start:start + chunk_rows]
+            return
+        # Unpack one window of the bitmap at a time rather than the whole mask
+        step = max(chunk_rows - chunk_rows % 8, 8)
+        for start in range(0, self.size, step):
+            window = np.unpackbits(self.bits[start // 8:(start + step) // 8],
+                                   count=min(step, self.size - start), bitorder='little')
+            positions = np.flatnonzero(window)
+            if len(positions):
+                yield _positions(positions + start, self.size)
+
+
+def _positions(positions, size):
+    return positions.astype('int32' if size < 2 ** 31 else 'int64')
+
+
+class FilterCache:
+    """Memory-budgeted LRU of filter results, shared by every session
+
+    Keyed by (snapshot version, canonical selection). Entries of older
+    snapshot versions are dropped as soon as a newer version is cached, and
+    results computed on an older version than the latest are not cached.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._latest_version = None
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key):
+        self.nbytes -= self._entries.pop(key).nbytes
+
+    def get(self, version, selection, compute):
+        """Cached RowSet for the selection; compute() builds it on a miss"""
+        key = (version, selection)
+        with self._lock:
+            rows = self._entries.get(key)
+            if rows is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rows
+            self.misses += 1
+
+        rows = compute()
+        with self._lock:
+            if self._latest_version is not None and version < self._latest_version:
+                return rows
+            if version != self._latest_version:
+                for stale in [k for k in self._entries if k[0] != version]:
+                    self._drop(stale)
+                self._latest_version = version
+            if key not in self._entries and rows.nbytes <= self.max_bytes:
+                self._entries[key] = rows
+                self.nbytes += rows.nbytes
+                while self.nbytes > self.max_bytes:
+                    self._drop(next(iter(self._entries)))
+                    self.evictions += 1
+        return rows
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'mb': self.nbytes / (1 << 20),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / requests if requests else 0.0
+            }
@@ -0,0 +1,86 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+def feature_fingerprints(chunk, features):
+    """64-bit hash of each row's model features"""
+    # Cast first so 1 and 1.0 hash the same across runs
+    return pd.util.hash_pandas_object(chunk[features].astype('float64'), index=False).to_numpy()
+
+
+def artifact_digest(*paths):
+    """Digest of the model artifacts; fingerprints are only valid for the same artifacts"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def load_fingerprints(path, digest):
+    """Previous fingerprints indexed by Customer_ID, or None if missing or stale"""
+    if not os.path.exists(path):
+        return None
+    table = feather.read_table(path)
+    if (table.schema.metadata or {}).get(b'artifacts') != digest.encode():
+        return None
+    df = table.to_pandas().drop_duplicates('Customer_ID', keep='last')
+    return pd.Series(df['fingerprint'].to_numpy(), index=df['Customer_ID'])
+
+
+def save_fingerprints(path, ids, fingerprints, digest):
+    """Write fingerprints for the next incremental run"""
+    table = pa.table({'Customer_ID': ids, 'fingerprint': fingerprints})
+    table = table.replace_schema_metadata({'artifacts': digest})
+    tmp = path + '.tmp'
+    feather.write_feather(table, tmp)
+    os.replace(tmp, path)
+
+
+class ChangeTracker:
+    """Fingerprints input chunks and filters them down to new or changed customers"""
+
+    def __init__(self, previous, features):
+        self.previous = previous
+        self.features = features
+        self.ids = []
+        self.fingerprints = []
+        self.unchanged = []
+        self.new = 0
+        self.changed = 0
+
+    def filter(self, chunk):
+        """Return the rows of chunk that need scoring"""
+        fingerprints = feature_fingerprints(chunk, self.features)
+        ids = chunk['Customer_ID'].to_numpy()
+        self.ids.append(ids)
+        self.fingerprints.append(fingerprints)
+        if self.previous is None:
+            self.new += len(chunk)
+            return chunk
+
+        pos = self.previous.index.get_indexer(ids)
+        known = pos >= 0
+        same = known & (self.previous.to_numpy()[np.where(known, pos, 0)] == fingerprints)
+        self.new += int((~known).sum())
+        self.changed += int((known & ~same).sum())
+        self.unchanged.append(ids[same])
+        return chunk[~same]
+
+    def unchanged_ids(self):
+        return pd.Index(np.concatenate(self.unchanged)) if self.unchanged else pd.Index([])
+
+    @property
+    def deleted(self):
+        if self.previous is None:
+            return 0
+        return len(self.previous) - len(self.unchanged_ids()) - self.changed
+
+    def save(self, path, digest):
+        save_fingerprints(path, np.concatenate(self.ids), np.concatenate(self.fingerprints), digest)
@@ -0,0 +1,125 @@
+"""Offline load generator for scoring_service.py
+
+Sends /score requests from concurrent clients, each reusing one keep-alive
+connection, with customers drawn from a synthetic table. Reports client-side
+throughput and p50/p99 latency next to the service's own /metrics. With
+--stand-in it first starts a service in this process on a stand-in model, so
+no artifacts or network are needed:
+
+    python load_generator.py --stand-in --clients 16 --requests 500 --batch 1
+    python load_generator.py --url http://127.0.0.1:8765 --clients 16 --requests 500
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+import model_serving
+import scoring_service
+import synthetic_data
+
+
+def request_bodies(rows, batch, seed=0):
+    """/score request bodies of batch customers each, from a synthetic scoring extract"""
+    extract = synthetic_data.scoring_extract(synthetic_data.customers(rows, 0.5, 0.8, seed))
+    records = extract.to_dict('records')
+    bodies = []
+    for start in range(0, len(records), batch):
+        customers = records[start:start + batch]
+        bodies.append(json.dumps(customers[0] if batch == 1 else {'customers': customers}).encode())
+    return bodies
+
+
+def _client(host, port, bodies, latencies, errors):
+    connection = http.client.HTTPConnection(host, port)
+    try:
+        for body in bodies:
+            start = time.perf_counter()
+            connection.request('POST', '/score', body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - start)
+            if response.status != 200:
+                errors.append(response.status)
+    finally:
+        connection.close()
+
+
+def run(url, clients, requests, batch, seed=0):
+    """Client-side figures of clients concurrent clients sending requests requests each"""
+    parsed = urllib.parse.urlsplit(url)
+    bodies = request_bodies(clients * requests * batch, batch, seed)
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=_client, args=(parsed.hostname, parsed.port, bodies[i::clients], latencies, errors))
+        for i in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'rows': len(latencies) * batch,
+        'errors': len(errors),
+        'seconds': seconds,
+        'requests_per_s': len(latencies) / seconds,
+        'rows_per_s': len(latencies) * batch / seconds,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99))
+    }
+
+
+def server_metrics(url):
+    parsed = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port)
+    try:
+        connection.request('GET', '/metrics')
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def stand_in_service(max_batch, max_wait_ms, seed=0):
+    """Start a scoring service on a stand-in model in a background thread; returns its URL"""
+    sample = synthetic_data.customers(20_000, 0.5, 0.8, seed)
+    model, scaler = synthetic_data.stand_in_artifacts(sample, model_serving.FEATURES)
+    service = scoring_service.ScoringService(model_serving.SegmentModel('stand-in', model, scaler),
+                                             max_batch, max_wait_ms)
+    server = scoring_service.serve(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test scoring_service.py offline")
+    parser.add_argument('--url', default='http://127.0.0.1:8765', help="running scoring service")
+    parser.add_argument('--stand-in', action='store_true', help="start a service on a stand-in model in-process")
+    parser.add_argument('--clients', type=int, default=16, help="concurrent clients")
+    parser.add_argument('--requests', type=int, default=500, help="requests per client")
+    parser.add_argument('--batch', type=int, default=1, help="customers per request")
+    parser.add_argument('--max-batch', type=int, default=1024, help="stand-in service: most rows per model call")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help="stand-in service: batching window")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    url = stand_in_service(args.max_batch, args.max_wait_ms, args.seed) if args.stand_in else args.url
+    figures = run(url, args.clients, args.requests, args.batch, args.seed)
+    print(f"Client: {figures['requests']:,} requests ({figures['rows']:,} customers) in {figures['seconds']:.1f}s, "
+          f"{figures['requests_per_s']:,.0f} req/s, p50 {figures['p50_ms']:.2f} ms, p99 {figures['p99_ms']:.2f} ms, "
+          f"{figures['errors']} errors")
+    metrics = server_metrics(url)
+    print(f"Service: p50 {metrics['p50_ms']:.2f} ms, p99 {metrics['p99_ms']:.2f} ms, {metrics['batches']:,} model calls, "
+          f"{metrics['mean_batch_rows']:.1f} customers per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Segment names, marketing strategies and campaign assumptions shared by the dashboard and scoring"""
+
+# Cluster mapping
+CLUSTER_MAPPING = {
+    1: "Bulk Dry Shoppers – Urban",
+    2: "Fresh-Focused Families – Suburban", 
+    3: "Balanced Shoppers – Urban",
+    4: "Bulk Dry Shoppers – Suburban",
+    5: "Balanced Shoppers – Suburban",
+    6: "Fresh-Focused Families – Urban"
+}
+
+# Marketing strategies
+MARKETING_STRATEGIES = {
+    "Bulk Dry Shoppers – Urban": {
+        "primary": "📱 Push bundle discounts via mobile app",
+        "secondary": "🏪 In-store bulk purchase promotions",
+        "channels": ["Mobile App", "Email", "In-store displays"],
+        "offers": ["Buy 3 Get 1 Free on dry goods", "20% off bulk purchases over Rs.100", "Monthly dry goods subscription box"],
+        "timing": "Weekend promotions, month-end bulk deals"
+    },
+    "Bulk Dry Shoppers – Suburban": {
+        "primary": "🚚 Home delivery discounts for bulk orders",
+        "secondary": "📧 Email campaigns with bulk savings",
+        "channels": ["Email", "Direct Mail", "Local newspaper ads"],
+        "offers": ["Free delivery on orders over Rs.75", "25% off quarterly bulk orders", "Family pack discounts"],
+        "timing": "Monthly family budget cycles, seasonal stocking"
+    },
+    "Fresh-Focused Families – Urban": {
+        "primary": "🥬 Weekly fresh produce delivery deals",
+        "secondary": "⏰ Same-day fresh delivery promotions",
+        "channels": ["Mobile App", "Social Media", "Local food blogs"],
+        "offers": ["Daily fresh deals", "Organic produce premium membership", "Recipe-based fresh bundles"],
+        "timing": "Daily fresh arrivals, weekend meal prep"
+    },
+    "Fresh-Focused Families – Suburban": {
+        "primary": "🚗 Drive-through fresh pickup services",
+        "secondary": "👨‍👩‍👧‍👦 Family-oriented fresh meal kits",
+        "channels": ["Local community groups", "School partnerships", "Social Media"],
+        "offers": ["Fresh family meal plans", "Kids' lunch prep kits", "Weekend BBQ fresh bundles"],
+        "timing": "School calendar aligned, weekend family time"
+    },
+    "Balanced Shoppers – Urban": {
+        "primary": "🎯 Cross-category coupons via app notifications",
+        "secondary": "🛒 Smart shopping list recommendations",
+        "channels": ["Mobile App", "Email", "Targeted online ads"],
+        "offers": ["Mix & match discounts", "Smart basket rewards", "Loyalty points multiplier"],
+        "timing": "Weekly shopping patterns, payday cycles"
+    },
+    "Balanced Shoppers – Suburban": {
+        "primary": "📱 SMS cross-category promotions",
+        "secondary": "🏪 In-store balanced shopping rewards",
+        "channels": ["SMS", "Local radio", "Community bulletin boards"],
+        "offers": ["Balanced basket bonuses", "Weekly shopping rewards", "Seasonal variety packs"],
+        "timing": "Weekly family shopping trips, seasonal transitions"
+    }
+}
+
+# Expected campaign response rate per segment
+RESPONSE_RATES = {
+    "Bulk Dry Shoppers – Urban": 0.15,
+    "Bulk Dry Shoppers – Suburban": 0.12,
+    "Fresh-Focused Families – Urban": 0.18,
+    "Fresh-Focused Families – Suburban": 0.16,
+    "Balanced Shoppers – Urban": 0.14,
+    "Balanced Shoppers – Suburban": 0.13
+}
+DEFAULT_RESPONSE_RATE = 0.14
+
+# Campaign Performance Predictor assumptions
+REACH_RATE = 0.8  # share of the targeted customers a campaign reaches
+ORDER_VALUE_UPLIFT = 1.25  # 25% increase in average order
+BUDGET_SHARE = 0.3  # suggested budget as a share of the additional revenue
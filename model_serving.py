@@ -0,0 +1,171 @@
+"""Load any of the trained segment models behind one vectorised predict interface
+
+The notebooks score each model family differently (Keras and LightGBM
+return class probabilities, the sklearn-style CatBoost, XGBoost and Random
+Forest classifiers labels or predict_proba). SegmentModel hides that:
+predict_segments(X) returns segment ids 1..6 and the probability of every
+segment for a whole feature array, a batch at a time.
+
+Run this module to compare the models on the same input, e.g. to pick the
+fastest one meeting the accuracy bar for the nightly scoring run:
+
+    python model_serving.py --input cleaned_test.csv --scaler scaler.sav \\
+        --model nn=finalized_model.sav --model lightgbm=LightGBM_Model.pkl --labels cluster_category
+"""
+import argparse
+import json
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['luxury_sales', 'fresh_sales', 'dry_sales', 'outlet_city']
+
+# Whether each model family was trained on StandardScaler output; only the NN was
+MODEL_KINDS = {
+    'nn': True,
+    'lightgbm': False,
+    'xgboost': False,
+    'catboost': False,
+    'random_forest': False
+}
+
+
+def load_artifact(path):
+    """Load a model or scaler saved by the training notebooks (pickle or joblib)"""
+    try:
+        import joblib
+    except ImportError:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    # joblib.load also reads plain pickles such as finalized_model.sav
+    return joblib.load(path)
+
+
+class SegmentModel:
+    """A trained segment model and, for the NN, the scaler it was trained with"""
+
+    def __init__(self, name, model, scaler=None):
+        self.name = name
+        self.model = model
+        self.scaler = scaler
+
+    def probabilities(self, X):
+        """Class probabilities of one batch of model inputs, one column per class"""
+        model = self.model
+        if hasattr(model, 'predict_proba'):
+            return np.asarray(model.predict_proba(X))
+        if hasattr(model, 'predict_on_batch'):
+            # Keras: no per-call progress bar or dataset set-up
+            return np.asarray(model.predict_on_batch(X))
+        pred = np.asarray(model.predict(X))
+        if pred.ndim == 2:
+            return pred
+        # Label-only models get one-hot probabilities
+        labels = pred.astype('int64')
+        onehot = np.zeros((len(labels), labels.max() + 1 if len(labels) else 1))
+        onehot[np.arange(len(labels)), labels] = 1.0
+        return onehot
+
+    def segment_ids(self, n_classes):
+        """Segment id of each probability column"""
+        classes = np.asarray(getattr(self.model, 'classes_', np.arange(n_classes))).astype('int64')
+        # Label-encoded classes 0..5 are segments 1..6
+        return classes + 1 if classes.min() == 0 else classes
+
+    def predict_segments(self, X, batch_size=8192):
+        """Segment ids and per-segment probabilities (float32) of every row of X"""
+        if len(X) == 0:
+            return np.empty(0, dtype='int64'), np.empty((0, 0), dtype='float32')
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        probabilities = None
+        for start in range(0, len(X), batch_size):
+            prob = self.probabilities(X[start:start + batch_size])
+            if probabilities is None:
+                probabilities = np.empty((len(X), prob.shape[1]), dtype='float32')
+            probabilities[start:start + batch_size] = prob
+        segments = self.segment_ids(probabilities.shape[1])[probabilities.argmax(axis=1)]
+        return segments, probabilities
+
+
+def load(kind, model_path, scaler_path=None):
+    """SegmentModel of one artifact; scaler_path is required for the kinds trained on scaled features"""
+    if kind not in MODEL_KINDS:
+        raise ValueError(f"Unknown model kind {kind!r}; expected one of {', '.join(MODEL_KINDS)}")
+    if MODEL_KINDS[kind] and scaler_path is None:
+        raise ValueError(f"A {kind} model needs the scaler it was trained with")
+    scaler = load_artifact(scaler_path) if MODEL_KINDS[kind] else None
+    return SegmentModel(kind, load_artifact(model_path), scaler)
+
+
+def measure(model, X, batch_size, repeat=3, labels=None):
+    """Latency per batch, throughput and (given labels) accuracy of one model on X"""
+    latencies = []
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scaled = X if model.scaler is None else model.scaler.transform(X)
+        for offset in range(0, len(X), batch_size):
+            batch_start = time.perf_counter()
+            model.probabilities(scaled[offset:offset + batch_size])
+            latencies.append(time.perf_counter() - batch_start)
+        best = min(best, time.perf_counter() - start)
+    figures = {
+        'model': model.name,
+        'rows': len(X),
+        'seconds': best,
+        'rows_per_s': len(X) / best if best else None,
+        'batch_p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'batch_p99_ms': float(np.percentile(latencies, 99) * 1000)
+    }
+    if labels is not None:
+        segments, _ = model.predict_segments(X, batch_size)
+        figures['accuracy'] = float((segments == np.asarray(labels)).mean())
+    return figures
+
+
+def parse_model(text):
+    """'lightgbm=LightGBM_Model.pkl' -> ('lightgbm', 'LightGBM_Model.pkl')"""
+    kind, sep, path = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected KIND=PATH, got {text!r}")
+    return kind, path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare segment models on the same input")
+    parser.add_argument('--input', default='cleaned_test.csv', help="CSV with the model features")
+    parser.add_argument('--model', type=parse_model, action='append', required=True,
+                        help=f"KIND=PATH, repeatable; KIND is one of {', '.join(MODEL_KINDS)}")
+    parser.add_argument('--scaler', help="StandardScaler fitted on training data (needed by nn)")
+    parser.add_argument('--labels', help="column with the true segment ids 1..6, to report accuracy")
+    parser.add_argument('--rows', type=int, help="only use the first ROWS rows")
+    parser.add_argument('--batch-size', type=int, default=8192, help="rows per predict call")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per model; the best is reported")
+    parser.add_argument('--output', help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(args.input, nrows=args.rows)
+    X = df[FEATURES]
+    labels = df[args.labels] if args.labels else None
+
+    results = []
+    for kind, path in args.model:
+        start = time.perf_counter()
+        model = load(kind, path, args.scaler)
+        load_seconds = time.perf_counter() - start
+        figures = dict(measure(model, X, args.batch_size, args.repeat, labels), path=path, load_seconds=load_seconds)
+        results.append(figures)
+        accuracy = f"{figures['accuracy']:>8.2%}" if 'accuracy' in figures else ''
+        print(f"{kind:<14} {figures['rows_per_s']:>14,.0f} rows/s  batch p50 {figures['batch_p50_ms']:>8.2f} ms  "
+              f"p99 {figures['batch_p99_ms']:>8.2f} ms  load {load_seconds:>6.2f} s {accuracy}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
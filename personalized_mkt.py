@@ -1,12 +1,22 @@
+import time
+SCRIPT_STARTED = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
+import os
+import threading
 from datetime import datetime
-import requests
-from io import StringIO
+import analytics
+import area_lookup
+import export
+import marketing
+import render_profiler
+import segment_cube
+import shared_data
+import snapshot_store
+
+# Time spent on the imports above; plotly is left to the chart tabs, which import it when first shown
+IMPORTS_MS = (time.perf_counter() - SCRIPT_STARTED) * 1000
 
 # Page configuration
 st.set_page_config(
@@ -49,528 +59,616 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Data loading function with caching
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_data():
-    """Load data from Google Sheets CSV"""
-    url = "https://docs.google.com/spreadsheets/d/e/2PACX-1vRZgNxyt--8_BClE5Aa371WTaNJ38f0lhiGeGAUre2LEhrzeIHQtSYxvBaMnJnAbodWhgitFfqPmUj2/pub?output=csv"
-    
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        df = pd.read_csv(StringIO(response.text))
-        
-        # Clean column names
-        df.columns = df.columns.str.strip()
-        
-        # Ensure numeric columns are properly formatted
-        numeric_cols = ['luxury_sales', 'fresh_sales', 'dry_sales', 'total_sales', 'predicted_customer_segmentation']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {str(e)}")
+# Data source (Google Sheets CSV URL or local file) and local snapshot location
+DATA_SOURCE = os.environ.get(
+    "DATA_SOURCE",
+    "https://docs.google.com/spreadsheets/d/e/2PACX-1vRZgNxyt--8_BClE5Aa371WTaNJ38f0lhiGeGAUre2LEhrzeIHQtSYxvBaMnJnAbodWhgitFfqPmUj2/pub?output=csv"
+)
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", ".snapshot")
+
+# City -> Area lookup built by area_lookup.py; the sheet's own Area column is used without it
+AREA_LOOKUP = os.environ.get("AREA_LOOKUP", area_lookup.LOOKUP_FILE)
+
+# Compact mode keeps city/area/segment as categorical codes and sales as float32
+COMPACT_SCHEMA = os.environ.get("COMPACT_SCHEMA", "0") == "1"
+
+# Row-level charts send at most this many points to the browser
+SCATTER_MAX_POINTS = int(os.environ.get("SCATTER_MAX_POINTS", "5000"))
+
+# Render profiling (also enabled per session with ?profile=1); traces go to PROFILE_TRACE if set
+PROFILE_DASHBOARD = os.environ.get("PROFILE_DASHBOARD", "0") == "1"
+PROFILE_TRACE = os.environ.get("PROFILE_TRACE")
+
+# Only the selected tab is computed and sent; LAZY_TABS=0 renders all four as st.tabs
+LAZY_TABS = os.environ.get("LAZY_TABS", "1") == "1"
+
+# Data loading function
+def load_data(current=None):
+    """Load data from the local snapshot, re-downloading only when the source changed
+
+    Returns None when current (the snapshot in use) is still up to date.
+    """
+    df, _ = snapshot_store.refresh(DATA_SOURCE, SNAPSHOT_DIR, reload=current is None)
+    if df is None:
         return None
+    
+    # Same Urban/Suburban split as scoring; cities missing from the lookup keep their Area
+    lookup = area_lookup.load(AREA_LOOKUP)
+    if lookup is not None:
+        df['Area'] = lookup.area_of(df['outlet_city']).fillna(df['Area'])
+    
+    # Add cluster names, pre-aggregate and index the filter columns once per refresh
+    return analytics.prepare(df, COMPACT_SCHEMA)
 
-# Cluster mapping
-CLUSTER_MAPPING = {
-    1: "Bulk Dry Shoppers – Urban",
-    2: "Fresh-Focused Families – Suburban", 
-    3: "Balanced Shoppers – Urban",
-    4: "Bulk Dry Shoppers – Suburban",
-    5: "Balanced Shoppers – Suburban",
-    6: "Fresh-Focused Families – Urban"
-}
+def close_data_service(service):
+    service.close(timeout=1)
+
+# One shared, read-only copy of the data for every session in the process,
+# reloaded in the background so no rerun waits on the download. Clearing the
+# cache stops the old service's refresher
+@st.cache_resource(on_release=close_data_service)
+def get_data_service():
+    return shared_data.SharedDataService(load_data, ttl=300).start()  # Reload every 5 minutes
+
+def import_charts():
+    import plotly.express as px
+    import plotly.graph_objects as go
+    return px, go
+
+def chart_modules(profiler):
+    """plotly.express and plotly.graph_objects; only the first import in the process costs anything"""
+    with profiler.stage("import plotly"):
+        return import_charts()
+
+# Started with the first data load, so the plotly import overlaps the download
+@st.cache_resource
+def preload_charts():
+    thread = threading.Thread(target=import_charts, name="preload-charts", daemon=True)
+    thread.start()
+    return thread
+
+def format_age(seconds):
+    """Human-readable age of the data, e.g. '3 min ago'"""
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    return f"{seconds / 3600:.1f} h ago"
+
+def show_chart(profiler, name, fig):
+    """st.plotly_chart, timed and sized when profiling"""
+    with profiler.stage(f"send {name}") as record:
+        st.plotly_chart(fig, use_container_width=True)
+    # Serialising the figure again is not free, so it is sized after the rerun is timed
+    profiler.measure_later(record, 'bytes', lambda: len(fig.to_json()))
+
+def show_downloads(label, write, snapshot, selection, file_name):
+    """One download button per export format; the file is only written when a button is clicked"""
+    for col, (fmt, mime) in zip(st.columns(len(export.FORMATS)), export.FORMATS.items()):
+        col.download_button(
+            f"⬇️ {label} ({fmt.upper()})",
+            data=export.download(write, snapshot, selection, fmt),
+            file_name=f"{file_name}.{fmt}",
+            mime=mime,
+            on_click="ignore"
+        )
+
+def render_cluster_summary(profiler, snapshot, selection, kpis, selected):
+    """Tab 1: segment sizes, the Urban/Suburban split and per-segment averages"""
+    px, _ = chart_modules(profiler)
+    total_customers = kpis['total_customers']
+    selected_clusters = selected['segments']
+    
+    st.header("Customer Segment Overview")
+    
+    if total_customers == 0:
+        st.warning("No data available for the selected filters.")
+        return
+    
+    # Key metrics
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>Total Customers</h3>
+            <h2>{total_customers:,}</h2>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        avg_total_sales = kpis['avg_total_sales']
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>Avg Total Sales</h3>
+            <h2>Rs.{avg_total_sales:,.2f}</h2>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        total_revenue = kpis['total_revenue']
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>Total Revenue</h3>
+            <h2>Rs.{total_revenue:,.2f}</h2>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col4:
+        unique_cities = kpis['active_cities']
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>Active Cities</h3>
+            <h2>{unique_cities}</h2>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Cluster distribution
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("Customer Distribution by Segment")
+        st.caption("📊 Shows the proportion of customers in each behavioral segment. Use this to identify your largest customer groups and prioritize marketing efforts accordingly.")
+        cluster_counts = analytics.counts(snapshot, selection, 'cluster_name')
+        fig_pie = px.pie(
+            values=cluster_counts.values,
+            names=cluster_counts.index,
+            title="Customer Segments Distribution"
+        )
+        fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+        show_chart(profiler, 'pie', fig_pie)
+    
+    with col2:
+        st.subheader("Urban vs Suburban Distribution")
+        st.caption("🏙️ Compares urban vs suburban customer distribution. This helps determine whether to focus marketing on city centers or suburban areas.")
+        area_counts = analytics.counts(snapshot, selection, 'Area')
+        fig_area = px.bar(
+            x=area_counts.index,
+            y=area_counts.values,
+            title="Customer Distribution by Area",
+            color=area_counts.index,
+            color_discrete_map={'Urban': '#1f77b4', 'Sub Urban': '#ff7f0e'}
+        )
+        show_chart(profiler, 'area', fig_area)
+    
+    # Cluster descriptions
+    st.subheader("Segment Characteristics")
+    segment_stats = analytics.segment_stats(snapshot, selection)
+    for cluster_name in selected_clusters:
+        if cluster_name in segment_stats.index:
+            stats = segment_stats.loc[cluster_name]
+            avg_luxury = segment_cube.mean(stats, 'luxury_sales')
+            avg_fresh = segment_cube.mean(stats, 'fresh_sales')
+            avg_dry = segment_cube.mean(stats, 'dry_sales')
+            customer_count = int(stats['rows'])
+    
+            st.markdown(f"""
+            <div class="cluster-description">
+                <h4>{cluster_name}</h4>
+                <p><strong>Customers:</strong> {customer_count:,} | 
+                <strong>Avg Luxury:</strong> Rs.{avg_luxury:.2f} | 
+                <strong>Avg Fresh:</strong> Rs.{avg_fresh:.2f} | 
+                <strong>Avg Dry:</strong> Rs.{avg_dry:.2f}</p>
+            </div>
+            """, unsafe_allow_html=True)
+
+def render_sales_trends(profiler, snapshot, selection, kpis, selected):
+    """Tab 2: category and segment sales, the sales histogram and the fresh vs dry scatter"""
+    px, go = chart_modules(profiler)
+    total_customers = kpis['total_customers']
+    
+    st.header("Sales Performance Analysis")
+    
+    if total_customers == 0:
+        st.warning("No data available for the selected filters.")
+        return
+    
+    # Sales by category
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("Sales by Category")
+        st.caption("💰 Total revenue breakdown by product category. Luxury items typically have higher margins, while fresh and dry goods drive volume.")
+        category_sales = analytics.category_sales(snapshot, selection)
+    
+        fig_category = px.bar(
+            x=list(category_sales.keys()),
+            y=list(category_sales.values()),
+            title="Total Sales by Product Category",
+            color=list(category_sales.keys()),
+            color_discrete_map={'Luxury': 'gold', 'Fresh': 'green', 'Dry': 'brown'}
+        )
+        fig_category.update_layout(yaxis_title="Sales (Rs.)")
+        show_chart(profiler, 'category', fig_category)
+    
+    with col2:
+        st.subheader("Average Sales by Segment")
+        st.caption("📈 Shows spending patterns across customer segments. Identify which segments spend more on which categories to tailor product recommendations.")
+        segment_sales = analytics.segment_averages(snapshot, selection)
+    
+        fig_segment = px.bar(
+            segment_sales,
+            title="Average Sales by Customer Segment",
+            barmode='group'
+        )
+        fig_segment.update_layout(xaxis_title="Customer Segment", yaxis_title="Average Sales (Rs.)")
+        show_chart(profiler, 'segment', fig_segment)
+    
+    # Sales distribution
+    st.subheader("Sales Distribution Analysis")
+    st.caption("📊 Deep dive into customer spending patterns to understand revenue distribution and identify high-value customers.")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.caption("📈 Distribution of total sales per customer. Look for peaks to identify common spending amounts and outliers for VIP customers.")
+        # Binned server-side so the payload is 30 bars regardless of row count
+        bin_centers, bin_widths, bin_counts = analytics.sales_histogram(snapshot, selection, 30)
+        fig_hist = go.Figure(go.Bar(x=bin_centers, y=bin_counts, width=bin_widths, marker_color='#1f77b4'))
+        fig_hist.update_layout(title="Total Sales Distribution", xaxis_title="total_sales", yaxis_title="count", bargap=0)
+        show_chart(profiler, 'hist', fig_hist)
+    
+    with col2:
+        st.caption("🎯 Relationship between fresh and dry goods spending by segment. Bubble size = luxury spending. Helps identify cross-selling opportunities.")
+        scatter_df, selected_rows = analytics.scatter_sample(snapshot, selection, SCATTER_MAX_POINTS)
+        scatter_title = "Fresh vs Dry Sales by Segment"
+        if len(scatter_df) < selected_rows:
+            scatter_title += f" ({len(scatter_df):,} of {selected_rows:,} customers shown)"
+        fig_scatter = px.scatter(
+            scatter_df,
+            x='fresh_sales',
+            y='dry_sales',
+            color='cluster_name',
+            size='luxury_sales',
+            title=scatter_title,
+            hover_data=['outlet_city', 'total_sales'],
+            render_mode='webgl'
+        )
+        show_chart(profiler, 'scatter', fig_scatter)
+
+def render_city_view(profiler, snapshot, selection, kpis, selected):
+    """Tab 3: city revenue, the city x segment heatmap and the city metrics export"""
+    px, _ = chart_modules(profiler)
+    total_customers = kpis['total_customers']
+    
+    st.header("City-Wise Performance")
+    
+    if total_customers == 0:
+        st.warning("No data available for the selected filters.")
+        return
+    
+    # City performance metrics
+    city_metrics = analytics.city_metrics(snapshot, selection)
+    
+    # Top performing cities
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("Top Cities by Revenue")
+        st.caption("🏆 Identifies highest revenue-generating cities. Focus expansion and premium services in these locations.")
+        top_cities = city_metrics.head(10)
+        fig_top_cities = px.bar(
+            x=top_cities.index,
+            y=top_cities['Total_Revenue'],
+            title="Top 10 Cities by Total Revenue"
+        )
+        fig_top_cities.update_layout(xaxis_title="City", yaxis_title="Total Revenue (Rs.)")
+        fig_top_cities.update_xaxes(tickangle=45)
+        show_chart(profiler, 'top_cities', fig_top_cities)
+    
+    with col2:
+        st.subheader("Average Sales per Customer by City")
+        st.caption("💎 Shows customer value by location. High values indicate affluent areas suitable for premium product positioning.")
+        fig_avg_sales = px.bar(
+            x=city_metrics.index,
+            y=city_metrics['Avg_Sales'],
+            title="Average Sales per Customer by City"
+        )
+        fig_avg_sales.update_layout(xaxis_title="City", yaxis_title="Average Sales (Rs.)")
+        fig_avg_sales.update_xaxes(tickangle=45)
+        show_chart(profiler, 'avg_sales', fig_avg_sales)
+    
+    # City-wise segment distribution
+    st.subheader("Customer Segments by City")
+    st.caption("🗺️ Heatmap showing which customer segments dominate in each city. Darker colors = more customers. Use this to localize marketing strategies.")
+    city_segments = analytics.city_segment_matrix(snapshot, selection)
+    
+    fig_heatmap = px.imshow(
+        city_segments.T,
+        title="Customer Segment Distribution Across Cities",
+        color_continuous_scale="Blues",
+        aspect="auto"
+    )
+    fig_heatmap.update_layout(
+        xaxis_title="City",
+        yaxis_title="Customer Segment"
+    )
+    show_chart(profiler, 'heatmap', fig_heatmap)
+    
+    # Detailed city table
+    st.subheader("Detailed City Performance")
+    st.caption("📋 Complete city metrics table. Sort by any column to find insights. Export for further analysis or reporting.")
+    with profiler.stage("send city_metrics") as record:
+        st.dataframe(city_metrics, use_container_width=True)
+        record['rows'] = len(city_metrics)
+    show_downloads("City metrics", export.city_metrics, snapshot, selection, "city_metrics")
 
-# Marketing strategies
-MARKETING_STRATEGIES = {
-    "Bulk Dry Shoppers – Urban": {
-        "primary": "📱 Push bundle discounts via mobile app",
-        "secondary": "🏪 In-store bulk purchase promotions",
-        "channels": ["Mobile App", "Email", "In-store displays"],
-        "offers": ["Buy 3 Get 1 Free on dry goods", "20% off bulk purchases over Rs.100", "Monthly dry goods subscription box"],
-        "timing": "Weekend promotions, month-end bulk deals"
-    },
-    "Bulk Dry Shoppers – Suburban": {
-        "primary": "🚚 Home delivery discounts for bulk orders",
-        "secondary": "📧 Email campaigns with bulk savings",
-        "channels": ["Email", "Direct Mail", "Local newspaper ads"],
-        "offers": ["Free delivery on orders over Rs.75", "25% off quarterly bulk orders", "Family pack discounts"],
-        "timing": "Monthly family budget cycles, seasonal stocking"
-    },
-    "Fresh-Focused Families – Urban": {
-        "primary": "🥬 Weekly fresh produce delivery deals",
-        "secondary": "⏰ Same-day fresh delivery promotions",
-        "channels": ["Mobile App", "Social Media", "Local food blogs"],
-        "offers": ["Daily fresh deals", "Organic produce premium membership", "Recipe-based fresh bundles"],
-        "timing": "Daily fresh arrivals, weekend meal prep"
-    },
-    "Fresh-Focused Families – Suburban": {
-        "primary": "🚗 Drive-through fresh pickup services",
-        "secondary": "👨‍👩‍👧‍👦 Family-oriented fresh meal kits",
-        "channels": ["Local community groups", "School partnerships", "Social Media"],
-        "offers": ["Fresh family meal plans", "Kids' lunch prep kits", "Weekend BBQ fresh bundles"],
-        "timing": "School calendar aligned, weekend family time"
-    },
-    "Balanced Shoppers – Urban": {
-        "primary": "🎯 Cross-category coupons via app notifications",
-        "secondary": "🛒 Smart shopping list recommendations",
-        "channels": ["Mobile App", "Email", "Targeted online ads"],
-        "offers": ["Mix & match discounts", "Smart basket rewards", "Loyalty points multiplier"],
-        "timing": "Weekly shopping patterns, payday cycles"
-    },
-    "Balanced Shoppers – Suburban": {
-        "primary": "📱 SMS cross-category promotions",
-        "secondary": "🏪 In-store balanced shopping rewards",
-        "channels": ["SMS", "Local radio", "Community bulletin boards"],
-        "offers": ["Balanced basket bonuses", "Weekly shopping rewards", "Seasonal variety packs"],
-        "timing": "Weekly family shopping trips, seasonal transitions"
+def render_marketing_strategy(profiler, snapshot, selection, kpis, selected):
+    """Tab 4: strategies, campaign projections and the target audience export"""
+    total_customers = kpis['total_customers']
+    selected_clusters = selected['segments']
+    selected_areas = selected['areas']
+    
+    st.header("🎯 Dynamic Marketing Strategy")
+    
+    if total_customers == 0:
+        st.warning("No data available for the selected filters.")
+        return
+    
+    # Strategy overview
+    st.subheader("Recommended Marketing Strategies")
+    st.markdown("*Strategies update dynamically based on your selected filters*")
+    
+    # One pass over the selected cube cells feeds every panel below
+    summary = analytics.segment_summary(snapshot, selection, 3)
+    
+    # Generate strategies for selected segments
+    for cluster_name in selected_clusters:
+        if cluster_name not in summary.index:
+            continue
+    
+        segment = summary.loc[cluster_name]
+        strategy = marketing.MARKETING_STRATEGIES.get(cluster_name, {})
+        customer_count = int(segment['rows'])
+        avg_sales = segment['avg_total_sales']
+    
+        st.markdown(f"""
+        <div class="strategy-box">
+            <h3>📊 {cluster_name}</h3>
+            <p><strong>Target Audience:</strong> {customer_count:,} customers | <strong>Avg Sales:</strong> Rs.{avg_sales:.2f}</p>
+            <p><strong>Top Cities:</strong> {', '.join(segment['top_cities'])}</p>
+            <p><strong>Area Focus:</strong> {', '.join([f"{area} ({count})" for area, count in zip(segment['areas'], segment['area_rows'])])}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+        # Use regular markdown for better compatibility
+        st.markdown(f"**🎯 Primary Strategy:**")
+        st.markdown(f"**{strategy.get('primary', 'Custom strategy needed')}**")
+    
+        st.markdown(f"**🎯 Secondary Strategy:**")
+        st.markdown(f"{strategy.get('secondary', 'Custom strategy needed')}")
+    
+        st.markdown(f"**📱 Recommended Channels:**")
+        st.markdown(f"{', '.join(strategy.get('channels', ['Custom channels needed']))}")
+    
+        st.markdown(f"**💡 Specific Offers:**")
+        for offer in strategy.get('offers', ['Custom offers needed']):
+            st.markdown(f"• {offer}")
+    
+        st.markdown(f"**⏰ Optimal Timing:**")
+        st.markdown(f"{strategy.get('timing', 'Custom timing strategy needed')}")
+    
+        st.markdown("---")
+    
+    # Campaign performance predictor
+    st.subheader("📈 Campaign Performance Predictor")
+    
+    projection = analytics.campaign_projection(snapshot, selection)
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("**Estimated Campaign Reach:**")
+        st.metric("Potential Customers Reached", f"{projection['estimated_reach']:,.0f}")
+    
+        st.markdown("**Expected Response Rates by Segment:**")
+        for cluster in selected_clusters:
+            expected_responses = summary['expected_responses'].get(cluster, 0)
+            st.metric(f"{cluster[:20]}...", f"{expected_responses:.0f} responses")
+    
+    with col2:
+        st.markdown("**ROI Projections:**")
+        st.metric("Current Avg Order Value", f"Rs.{projection['current_avg']:.2f}")
+        st.metric("Projected Avg Order Value", f"Rs.{projection['projected_avg']:.2f}")
+        st.metric("Estimated Additional Revenue", f"Rs.{projection['additional_revenue']:,.2f}")
+    
+        # Campaign budget suggestion
+        st.metric("Suggested Campaign Budget", f"Rs.{projection['suggested_budget']:,.2f}")
+    
+    # Action items
+    st.subheader("🎯 Immediate Action Items")
+    
+    action_items = []
+    
+    if "Urban" in [area for area in selected_areas]:
+        action_items.append("🏙️ **Urban Focus**: Enhance mobile app features and push notifications")
+    
+    if "Sub Urban" in [area for area in selected_areas]:
+        action_items.append("🏡 **Suburban Focus**: Strengthen delivery services and local partnerships")
+    
+    if any("Fresh-Focused" in cluster for cluster in selected_clusters):
+        action_items.append("🥬 **Fresh Strategy**: Implement daily fresh deals and recipe recommendations")
+    
+    if any("Bulk Dry" in cluster for cluster in selected_clusters):
+        action_items.append("📦 **Bulk Strategy**: Create subscription services and bulk discount programs")
+    
+    if any("Balanced" in cluster for cluster in selected_clusters):
+        action_items.append("⚖️ **Balanced Strategy**: Develop cross-category promotion engine")
+    
+    for item in action_items:
+        st.markdown(item)
+    
+    # Campaign timeline
+    st.subheader("📅 Suggested Campaign Timeline")
+    
+    timeline_data = {
+        "Week": ["Week 1", "Week 2", "Week 3", "Week 4"],
+        "Activity": [
+            "Campaign setup & audience targeting",
+            "Launch primary strategies",
+            "Monitor & optimize",
+            "Analyze results & plan next phase"
+        ],
+        "Focus": [
+            "Data preparation & creative development",
+            "Multi-channel campaign launch",
+            "Performance tracking & A/B testing",
+            "ROI analysis & strategy refinement"
+        ]
     }
+    
+    timeline_df = pd.DataFrame(timeline_data)
+    st.dataframe(timeline_df, use_container_width=True, hide_index=True)
+    
+    # Campaign audience export
+    st.subheader("📤 Export Target Audience")
+    st.caption(f"📋 The {total_customers:,} selected customers with their segment, recommended strategy and channels, for campaign targeting tools.")
+    show_downloads("Target audience", export.customers, snapshot, selection, "target_audience")
+
+TABS = {
+    "📈 Cluster Summary": render_cluster_summary,
+    "💰 Sales Trends": render_sales_trends,
+    "🏙️ City-Wise View": render_city_view,
+    "🎯 Marketing Strategy": render_marketing_strategy
 }
 
-def main():
+def render_tab(profiler, number, label, snapshot, selection, kpis, selected):
+    """Render one tab under its own profiler stage, e.g. 'tab2 Sales Trends'"""
+    with profiler.stage(f"tab{number + 1} {label.split(' ', 1)[1]}"):
+        TABS[label](profiler, snapshot, selection, kpis, selected)
+
+def render_dashboard(profiler):
     # Header
     st.markdown('<h1 class="main-header">🛒 Customer Segmentation Dashboard</h1>', unsafe_allow_html=True)
     
     # Load data
-    with st.spinner("Loading real-time data from Google Sheets..."):
-        df = load_data()
-    
-    if df is None:
+    preload_charts()
+    data_service = get_data_service()
+    try:
+        with st.spinner("Loading real-time data from Google Sheets..."), profiler.stage("load data") as record:
+            snapshot = data_service.get()
+            record['rows'] = len(snapshot.df)
+    except Exception as e:
+        st.error(f"Error loading data: {str(e)}")
         st.error("Failed to load data. Please check the connection.")
         return
     
-    # Add cluster names to dataframe
-    df['cluster_name'] = df['predicted_customer_segmentation'].map(CLUSTER_MAPPING)
+    # The snapshot and analytics results are shared across sessions and must not be modified
+    profiler.context['snapshot_version'] = snapshot.version
     
     # Sidebar filters
     st.sidebar.header("🎛️ Filters")
     
     # Refresh button
     if st.sidebar.button("🔄 Refresh Data"):
-        st.cache_data.clear()
-        st.rerun()
-    
-    # Filter by cluster
-    clusters = sorted(df['predicted_customer_segmentation'].unique())
-    cluster_names = [CLUSTER_MAPPING[c] for c in clusters]
-    selected_clusters = st.sidebar.multiselect(
-        "Select Customer Segments:",
-        options=cluster_names,
-        default=cluster_names
-    )
+        data_service.refresh()
+        st.toast("Refreshing data in the background. New data appears on your next interaction.")
     
-    # Filter by city
-    cities = sorted(df['outlet_city'].unique())
-    selected_cities = st.sidebar.multiselect(
-        "Select Cities:",
-        options=cities,
-        default=cities
-    )
+    with profiler.stage("filter options"):
+        options = analytics.filter_options(snapshot)
+        
+        # Filter by cluster
+        cluster_names = options['segments']
+        selected_clusters = st.sidebar.multiselect(
+            "Select Customer Segments:",
+            options=cluster_names,
+            default=cluster_names
+        )
     
-    # Filter by area
-    areas = sorted(df['Area'].unique())
-    selected_areas = st.sidebar.multiselect(
-        "Select Areas:",
-        options=areas,
-        default=areas
-    )
+        # Filter by city
+        cities = options['cities']
+        selected_cities = st.sidebar.multiselect(
+            "Select Cities:",
+            options=cities,
+            default=cities
+        )
     
-    # Apply filters
-    filtered_df = df[
-        (df['cluster_name'].isin(selected_clusters)) &
-        (df['outlet_city'].isin(selected_cities)) &
-        (df['Area'].isin(selected_areas))
-    ]
+        # Filter by area
+        areas = options['areas']
+        selected_areas = st.sidebar.multiselect(
+            "Select Areas:",
+            options=areas,
+            default=areas
+        )
+    
+    profiler.context['filters'] = {
+        'segments': len(selected_clusters), 'cities': len(selected_cities), 'areas': len(selected_areas)
+    }
+    
+    # Every figure below comes from the memoised analytics layer, keyed on
+    # the snapshot version and this selection
+    selection = analytics.selection(selected_clusters, selected_cities, selected_areas)
+    with profiler.stage("kpis"):
+        kpis = analytics.kpis(snapshot, selection)
+    total_customers = kpis['total_customers']
     
     # Show filter summary
     st.sidebar.markdown("---")
     st.sidebar.markdown(f"**📊 Filtered Data Summary:**")
-    st.sidebar.markdown(f"- Total Customers: {len(filtered_df):,}")
+    st.sidebar.markdown(f"- Total Customers: {total_customers:,}")
     st.sidebar.markdown(f"- Cities: {len(selected_cities)}")
     st.sidebar.markdown(f"- Segments: {len(selected_clusters)}")
     
+    # Shared cache readout
+    with st.sidebar.expander("🧠 Shared Data Cache"):
+        cache_stats = data_service.stats()
+        st.markdown(f"- Snapshot version: {cache_stats['version']} ({cache_stats['rows']:,} rows)")
+        if cache_stats['checked_age'] is not None:
+            st.markdown(f"- Source checked {format_age(cache_stats['checked_age'])} ({cache_stats['checks']:,} checks)")
+        if cache_stats['refreshing']:
+            st.markdown("- Background refresh in progress")
+        if cache_stats['last_error']:
+            st.markdown(f"- ⚠️ Last refresh failed: {cache_stats['last_error']}")
+        st.markdown(f"- Snapshot memory: {cache_stats['snapshot_mb']:,.1f} MB")
+        st.markdown(f"- Hit rate: {cache_stats['hit_rate']:.1%} ({cache_stats['hits']:,} hits / {cache_stats['misses']:,} loads)")
+        if cache_stats['peak_rss_mb'] is not None:
+            st.markdown(f"- Process peak RSS: {cache_stats['peak_rss_mb']:,.1f} MB")
+        result_stats = analytics.stats()
+        st.markdown(f"- Result cache: {result_stats['hit_rate']:.1%} hits ({result_stats['entries']:,} results)")
+        filter_stats = analytics.filter_stats()
+        st.markdown(f"- Filter cache: {filter_stats['hit_rate']:.1%} hits ({filter_stats['entries']:,} selections, "
+                    f"{filter_stats['mb']:,.1f} MB, {filter_stats['evictions']:,} evicted)")
+    
     # Main dashboard tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["📈 Cluster Summary", "💰 Sales Trends", "🏙️ City-Wise View", "🎯 Marketing Strategy"])
+    selected = {'segments': selected_clusters, 'cities': selected_cities, 'areas': selected_areas}
+    labels = list(TABS)
+    if LAZY_TABS:
+        # st.tabs would run every tab's code on every rerun; a selector runs only the visible one
+        active = st.radio("View", labels, horizontal=True, key="active_tab", label_visibility="collapsed")
+        profiler.context['active_tab'] = active
+        render_tab(profiler, labels.index(active), active, snapshot, selection, kpis, selected)
+    else:
+        for number, (tab, label) in enumerate(zip(st.tabs(labels), labels)):
+            with tab:
+                render_tab(profiler, number, label, snapshot, selection, kpis, selected)
     
-    with tab1:
-        st.header("Customer Segment Overview")
-        
-        if len(filtered_df) == 0:
-            st.warning("No data available for the selected filters.")
-            return
-        
-        # Key metrics
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown(f"""
-            <div class="metric-card">
-                <h3>Total Customers</h3>
-                <h2>{len(filtered_df):,}</h2>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            avg_total_sales = filtered_df['total_sales'].mean()
-            st.markdown(f"""
-            <div class="metric-card">
-                <h3>Avg Total Sales</h3>
-                <h2>Rs.{avg_total_sales:,.2f}</h2>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            total_revenue = filtered_df['total_sales'].sum()
-            st.markdown(f"""
-            <div class="metric-card">
-                <h3>Total Revenue</h3>
-                <h2>Rs.{total_revenue:,.2f}</h2>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col4:
-            unique_cities = filtered_df['outlet_city'].nunique()
-            st.markdown(f"""
-            <div class="metric-card">
-                <h3>Active Cities</h3>
-                <h2>{unique_cities}</h2>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # Cluster distribution
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.subheader("Customer Distribution by Segment")
-            st.caption("📊 Shows the proportion of customers in each behavioral segment. Use this to identify your largest customer groups and prioritize marketing efforts accordingly.")
-            cluster_counts = filtered_df['cluster_name'].value_counts()
-            fig_pie = px.pie(
-                values=cluster_counts.values,
-                names=cluster_counts.index,
-                title="Customer Segments Distribution"
-            )
-            fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig_pie, use_container_width=True)
-        
-        with col2:
-            st.subheader("Urban vs Suburban Distribution")
-            st.caption("🏙️ Compares urban vs suburban customer distribution. This helps determine whether to focus marketing on city centers or suburban areas.")
-            area_counts = filtered_df['Area'].value_counts()
-            fig_area = px.bar(
-                x=area_counts.index,
-                y=area_counts.values,
-                title="Customer Distribution by Area",
-                color=area_counts.index,
-                color_discrete_map={'Urban': '#1f77b4', 'Sub Urban': '#ff7f0e'}
-            )
-            st.plotly_chart(fig_area, use_container_width=True)
-        
-        # Cluster descriptions
-        st.subheader("Segment Characteristics")
-        for cluster_name in selected_clusters:
-            cluster_data = filtered_df[filtered_df['cluster_name'] == cluster_name]
-            if len(cluster_data) > 0:
-                avg_luxury = cluster_data['luxury_sales'].mean()
-                avg_fresh = cluster_data['fresh_sales'].mean()
-                avg_dry = cluster_data['dry_sales'].mean()
-                customer_count = len(cluster_data)
-                
-                st.markdown(f"""
-                <div class="cluster-description">
-                    <h4>{cluster_name}</h4>
-                    <p><strong>Customers:</strong> {customer_count:,} | 
-                    <strong>Avg Luxury:</strong> Rs.{avg_luxury:.2f} | 
-                    <strong>Avg Fresh:</strong> Rs.{avg_fresh:.2f} | 
-                    <strong>Avg Dry:</strong> Rs.{avg_dry:.2f}</p>
-                </div>
-                """, unsafe_allow_html=True)
-    
-    with tab2:
-        st.header("Sales Performance Analysis")
-        
-        if len(filtered_df) == 0:
-            st.warning("No data available for the selected filters.")
-            return
-        
-        # Sales by category
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.subheader("Sales by Category")
-            st.caption("💰 Total revenue breakdown by product category. Luxury items typically have higher margins, while fresh and dry goods drive volume.")
-            category_sales = {
-                'Luxury': filtered_df['luxury_sales'].sum(),
-                'Fresh': filtered_df['fresh_sales'].sum(),
-                'Dry': filtered_df['dry_sales'].sum()
-            }
-            
-            fig_category = px.bar(
-                x=list(category_sales.keys()),
-                y=list(category_sales.values()),
-                title="Total Sales by Product Category",
-                color=list(category_sales.keys()),
-                color_discrete_map={'Luxury': 'gold', 'Fresh': 'green', 'Dry': 'brown'}
-            )
-            fig_category.update_layout(yaxis_title="Sales (Rs.)")
-            st.plotly_chart(fig_category, use_container_width=True)
-        
-        with col2:
-            st.subheader("Average Sales by Segment")
-            st.caption("📈 Shows spending patterns across customer segments. Identify which segments spend more on which categories to tailor product recommendations.")
-            segment_sales = filtered_df.groupby('cluster_name')[['luxury_sales', 'fresh_sales', 'dry_sales']].mean()
-            
-            fig_segment = px.bar(
-                segment_sales,
-                title="Average Sales by Customer Segment",
-                barmode='group'
-            )
-            fig_segment.update_layout(xaxis_title="Customer Segment", yaxis_title="Average Sales (Rs.)")
-            st.plotly_chart(fig_segment, use_container_width=True)
-        
-        # Sales distribution
-        st.subheader("Sales Distribution Analysis")
-        st.caption("📊 Deep dive into customer spending patterns to understand revenue distribution and identify high-value customers.")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.caption("📈 Distribution of total sales per customer. Look for peaks to identify common spending amounts and outliers for VIP customers.")
-            fig_hist = px.histogram(
-                filtered_df,
-                x='total_sales',
-                nbins=30,
-                title="Total Sales Distribution",
-                color_discrete_sequence=['#1f77b4']
-            )
-            st.plotly_chart(fig_hist, use_container_width=True)
-        
-        with col2:
-            st.caption("🎯 Relationship between fresh and dry goods spending by segment. Bubble size = luxury spending. Helps identify cross-selling opportunities.")
-            fig_scatter = px.scatter(
-                filtered_df,
-                x='fresh_sales',
-                y='dry_sales',
-                color='cluster_name',
-                size='luxury_sales',
-                title="Fresh vs Dry Sales by Segment",
-                hover_data=['outlet_city', 'total_sales']
-            )
-            st.plotly_chart(fig_scatter, use_container_width=True)
-    
-    with tab3:
-        st.header("City-Wise Performance")
-        
-        if len(filtered_df) == 0:
-            st.warning("No data available for the selected filters.")
-            return
-        
-        # City performance metrics
-        city_metrics = filtered_df.groupby('outlet_city').agg({
-            'Customer_ID': 'count',
-            'total_sales': ['sum', 'mean'],
-            'luxury_sales': 'mean',
-            'fresh_sales': 'mean',
-            'dry_sales': 'mean'
-        }).round(2)
-        
-        city_metrics.columns = ['Customer_Count', 'Total_Revenue', 'Avg_Sales', 'Avg_Luxury', 'Avg_Fresh', 'Avg_Dry']
-        city_metrics = city_metrics.sort_values('Total_Revenue', ascending=False)
-        
-        # Top performing cities
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.subheader("Top Cities by Revenue")
-            st.caption("🏆 Identifies highest revenue-generating cities. Focus expansion and premium services in these locations.")
-            top_cities = city_metrics.head(10)
-            fig_top_cities = px.bar(
-                x=top_cities.index,
-                y=top_cities['Total_Revenue'],
-                title="Top 10 Cities by Total Revenue"
-            )
-            fig_top_cities.update_layout(xaxis_title="City", yaxis_title="Total Revenue (Rs.)")
-            fig_top_cities.update_xaxes(tickangle=45)
-            st.plotly_chart(fig_top_cities, use_container_width=True)
-        
-        with col2:
-            st.subheader("Average Sales per Customer by City")
-            st.caption("💎 Shows customer value by location. High values indicate affluent areas suitable for premium product positioning.")
-            fig_avg_sales = px.bar(
-                x=city_metrics.index,
-                y=city_metrics['Avg_Sales'],
-                title="Average Sales per Customer by City"
-            )
-            fig_avg_sales.update_layout(xaxis_title="City", yaxis_title="Average Sales (Rs.)")
-            fig_avg_sales.update_xaxes(tickangle=45)
-            st.plotly_chart(fig_avg_sales, use_container_width=True)
-        
-        # City-wise segment distribution
-        st.subheader("Customer Segments by City")
-        st.caption("🗺️ Heatmap showing which customer segments dominate in each city. Darker colors = more customers. Use this to localize marketing strategies.")
-        city_segments = filtered_df.groupby(['outlet_city', 'cluster_name']).size().unstack(fill_value=0)
-        
-        fig_heatmap = px.imshow(
-            city_segments.T,
-            title="Customer Segment Distribution Across Cities",
-            color_continuous_scale="Blues",
-            aspect="auto"
-        )
-        fig_heatmap.update_layout(
-            xaxis_title="City",
-            yaxis_title="Customer Segment"
-        )
-        st.plotly_chart(fig_heatmap, use_container_width=True)
-        
-        # Detailed city table
-        st.subheader("Detailed City Performance")
-        st.caption("📋 Complete city metrics table. Sort by any column to find insights. Export for further analysis or reporting.")
-        st.dataframe(city_metrics, use_container_width=True)
+    if total_customers == 0:
+        return
     
-    with tab4:
-        st.header("🎯 Dynamic Marketing Strategy")
-        
-        if len(filtered_df) == 0:
-            st.warning("No data available for the selected filters.")
-            return
-        
-        # Strategy overview
-        st.subheader("Recommended Marketing Strategies")
-        st.markdown("*Strategies update dynamically based on your selected filters*")
-        
-        # Generate strategies for selected segments
-        for cluster_name in selected_clusters:
-            cluster_data = filtered_df[filtered_df['cluster_name'] == cluster_name]
-            
-            if len(cluster_data) == 0:
-                continue
-            
-            strategy = MARKETING_STRATEGIES.get(cluster_name, {})
-            customer_count = len(cluster_data)
-            avg_sales = cluster_data['total_sales'].mean()
-            top_cities = cluster_data['outlet_city'].value_counts().head(3)
-            areas = cluster_data['Area'].value_counts()
-            
-            st.markdown(f"""
-            <div class="strategy-box">
-                <h3>📊 {cluster_name}</h3>
-                <p><strong>Target Audience:</strong> {customer_count:,} customers | <strong>Avg Sales:</strong> Rs.{avg_sales:.2f}</p>
-                <p><strong>Top Cities:</strong> {', '.join(top_cities.index.tolist())}</p>
-                <p><strong>Area Focus:</strong> {', '.join([f"{area} ({count})" for area, count in areas.items()])}</p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Use regular markdown for better compatibility
-            st.markdown(f"**🎯 Primary Strategy:**")
-            st.markdown(f"**{strategy.get('primary', 'Custom strategy needed')}**")
-            
-            st.markdown(f"**🎯 Secondary Strategy:**")
-            st.markdown(f"{strategy.get('secondary', 'Custom strategy needed')}")
-            
-            st.markdown(f"**📱 Recommended Channels:**")
-            st.markdown(f"{', '.join(strategy.get('channels', ['Custom channels needed']))}")
-            
-            st.markdown(f"**💡 Specific Offers:**")
-            for offer in strategy.get('offers', ['Custom offers needed']):
-                st.markdown(f"• {offer}")
-            
-            st.markdown(f"**⏰ Optimal Timing:**")
-            st.markdown(f"{strategy.get('timing', 'Custom timing strategy needed')}")
-            
-            st.markdown("---")
-        
-        # Campaign performance predictor
-        st.subheader("📈 Campaign Performance Predictor")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("**Estimated Campaign Reach:**")
-            total_customers = len(filtered_df)
-            estimated_reach = min(total_customers * 0.8, total_customers)  # 80% reach rate
-            st.metric("Potential Customers Reached", f"{estimated_reach:,.0f}")
-            
-            st.markdown("**Expected Response Rates by Segment:**")
-            response_rates = {
-                "Bulk Dry Shoppers – Urban": 0.15,
-                "Bulk Dry Shoppers – Suburban": 0.12,
-                "Fresh-Focused Families – Urban": 0.18,
-                "Fresh-Focused Families – Suburban": 0.16,
-                "Balanced Shoppers – Urban": 0.14,
-                "Balanced Shoppers – Suburban": 0.13
-            }
-            
-            for cluster in selected_clusters:
-                cluster_size = len(filtered_df[filtered_df['cluster_name'] == cluster])
-                response_rate = response_rates.get(cluster, 0.14)
-                expected_responses = cluster_size * response_rate
-                st.metric(f"{cluster[:20]}...", f"{expected_responses:.0f} responses")
-        
-        with col2:
-            st.markdown("**ROI Projections:**")
-            avg_order_increase = 1.25  # 25% increase in average order
-            current_avg = filtered_df['total_sales'].mean()
-            projected_avg = current_avg * avg_order_increase
-            additional_revenue = (projected_avg - current_avg) * estimated_reach * 0.14  # 14% avg response rate
-            
-            st.metric("Current Avg Order Value", f"Rs.{current_avg:.2f}")
-            st.metric("Projected Avg Order Value", f"Rs.{projected_avg:.2f}")
-            st.metric("Estimated Additional Revenue", f"Rs.{additional_revenue:,.2f}")
-            
-            # Campaign budget suggestion
-            suggested_budget = additional_revenue * 0.3  # 30% of additional revenue
-            st.metric("Suggested Campaign Budget", f"Rs.{suggested_budget:,.2f}")
-        
-        # Action items
-        st.subheader("🎯 Immediate Action Items")
-        
-        action_items = []
-        
-        if "Urban" in [area for area in selected_areas]:
-            action_items.append("🏙️ **Urban Focus**: Enhance mobile app features and push notifications")
-        
-        if "Sub Urban" in [area for area in selected_areas]:
-            action_items.append("🏡 **Suburban Focus**: Strengthen delivery services and local partnerships")
-        
-        if any("Fresh-Focused" in cluster for cluster in selected_clusters):
-            action_items.append("🥬 **Fresh Strategy**: Implement daily fresh deals and recipe recommendations")
-        
-        if any("Bulk Dry" in cluster for cluster in selected_clusters):
-            action_items.append("📦 **Bulk Strategy**: Create subscription services and bulk discount programs")
-        
-        if any("Balanced" in cluster for cluster in selected_clusters):
-            action_items.append("⚖️ **Balanced Strategy**: Develop cross-category promotion engine")
-        
-        for item in action_items:
-            st.markdown(item)
-        
-        # Campaign timeline
-        st.subheader("📅 Suggested Campaign Timeline")
-        
-        timeline_data = {
-            "Week": ["Week 1", "Week 2", "Week 3", "Week 4"],
-            "Activity": [
-                "Campaign setup & audience targeting",
-                "Launch primary strategies",
-                "Monitor & optimize",
-                "Analyze results & plan next phase"
-            ],
-            "Focus": [
-                "Data preparation & creative development",
-                "Multi-channel campaign launch",
-                "Performance tracking & A/B testing",
-                "ROI analysis & strategy refinement"
-            ]
-        }
-        
-        timeline_df = pd.DataFrame(timeline_data)
-        st.dataframe(timeline_df, use_container_width=True, hide_index=True)
-
     # Footer
     st.markdown("---")
-    st.markdown(f"*Dashboard last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Data refreshes every 5 minutes*")
+    loaded_at = datetime.fromtimestamp(snapshot.loaded_at).strftime('%Y-%m-%d %H:%M:%S')
+    st.markdown(f"*Data loaded {loaded_at} ({format_age(datetime.now().timestamp() - snapshot.loaded_at)}) | Refreshed in the background every 5 minutes*")
+
+def show_profile(profiler):
+    """Timing panel for this rerun, plus a JSON line in PROFILE_TRACE if set"""
+    profiler.finish()
+    with st.sidebar.expander("⏱️ Render Profile"):
+        st.markdown(f"- Rerun total: {profiler.total_ms():,.1f} ms")
+        timings = pd.DataFrame(profiler.table(), columns=['stage', 'ms', 'rows', 'bytes'])
+        st.dataframe(timings.astype({'rows': 'Int64', 'bytes': 'Int64'}), hide_index=True)
+    if PROFILE_TRACE:
+        profiler.write_trace(PROFILE_TRACE)
+
+def main():
+    profiler = render_profiler.RenderProfiler(PROFILE_DASHBOARD or st.query_params.get("profile") == "1",
+                                              started=SCRIPT_STARTED)
+    profiler.context['lazy_tabs'] = LAZY_TABS
+    profiler.add("imports", IMPORTS_MS)
+    try:
+        render_dashboard(profiler)
+    finally:
+        if profiler.enabled:
+            show_profile(profiler)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
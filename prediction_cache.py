@@ -0,0 +1,114 @@
+import collections
+import os
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+class Pending:
+    """Result of a cache lookup whose misses still need predicting"""
+    __slots__ = ('keys', 'inverse', 'segments', 'missing', 'missing_features')
+
+    def __init__(self, keys, inverse, segments, missing, missing_features):
+        self.keys = keys
+        self.inverse = inverse
+        self.segments = segments
+        self.missing = missing
+        self.missing_features = missing_features
+
+
+class PredictionCache:
+    """Bounded LRU of segment predictions keyed by feature vector
+
+    Identical rows within a batch are predicted once, and rows seen in
+    earlier batches or runs are not predicted at all. With quantum set, the
+    quantize_columns are rounded to that step before lookup, so near-identical
+    customers share a prediction.
+    """
+
+    def __init__(self, max_entries=1_000_000, quantum=None, quantize_columns=None):
+        self.max_entries = max_entries
+        self.quantum = quantum
+        self.quantize_columns = quantize_columns
+        self._entries = collections.OrderedDict()
+        self.rows = 0
+        self.predicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _normalise(self, features):
+        features = features.astype('float64')
+        if self.quantum:
+            columns = self.quantize_columns or list(features.columns)
+            # + 0.0 folds -0.0 into 0.0 so both map to the same key
+            features[columns] = np.round(features[columns] / self.quantum) * self.quantum + 0.0
+        return features
+
+    def lookup(self, features):
+        """Resolve cached rows of a feature frame; misses are left for complete()"""
+        features = self._normalise(features)
+        values = np.ascontiguousarray(features.to_numpy())
+        row_keys = values.view(np.dtype((np.void, values.itemsize * values.shape[1]))).ravel()
+        keys, first, inverse = np.unique(row_keys, return_index=True, return_inverse=True)
+
+        segments = np.empty(len(keys), dtype='int64')
+        missing = []
+        for i, key in enumerate(keys):
+            segment = self._entries.get(key.tobytes())
+            if segment is None:
+                missing.append(i)
+            else:
+                self._entries.move_to_end(key.tobytes())
+                segments[i] = segment
+
+        missing = np.asarray(missing, dtype='int64')
+        self.rows += len(features)
+        self.predicted += len(missing)
+        return Pending(keys, inverse.ravel(), segments, missing, features.iloc[first[missing]])
+
+    def complete(self, pending, predicted):
+        """Store predictions for the misses and return segments for every row"""
+        pending.segments[pending.missing] = predicted
+        for i in pending.missing:
+            self._entries[pending.keys[i].tobytes()] = int(pending.segments[i])
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return pending.segments[pending.inverse]
+
+    def _settings(self):
+        return repr((self.quantum, self.quantize_columns))
+
+    def stats(self):
+        return {
+            'rows': self.rows,
+            'predicted': self.predicted,
+            'hit_rate': 1 - self.predicted / self.rows if self.rows else 0.0,
+            'entries': len(self._entries)
+        }
+
+    def save(self, path, columns, digest):
+        """Persist entries in LRU order, tagged with the model artifacts digest"""
+        keys = np.frombuffer(b''.join(self._entries), dtype='float64').reshape(-1, len(columns))
+        data = {col: keys[:, i] for i, col in enumerate(columns)}
+        data['segment'] = np.fromiter(self._entries.values(), dtype='int64', count=len(self._entries))
+        table = pa.table(data).replace_schema_metadata({'artifacts': digest, 'settings': self._settings()})
+        tmp = path + '.tmp'
+        feather.write_feather(table, tmp)
+        os.replace(tmp, path)
+
+    def load(self, path, columns, digest):
+        """Load persisted entries unless they belong to other artifacts or settings"""
+        if not os.path.exists(path):
+            return
+        table = feather.read_table(path)
+        metadata = table.schema.metadata or {}
+        if metadata.get(b'artifacts') != digest.encode() or metadata.get(b'settings') != self._settings().encode():
+            return
+        df = table.to_pandas()
+        keys = np.ascontiguousarray(df[columns].to_numpy(dtype='float64'))
+        for key, segment in zip(keys, df['segment'].to_numpy()):
+            self._entries[key.tobytes()] = int(segment)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
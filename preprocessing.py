@@ -0,0 +1,165 @@
+"""Clean raw customer extracts in one pass
+
+Vectorised version of the cleaning in Updated_Data_Preprocessing_Train.ipynb
+and Updated_Datapreprocessing_Test.ipynb, shared by training, scoring and the
+dashboard's load_data().
+
+    python preprocessing.py traincsv.csv cleaned_train.csv
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+SALES_COLS = ['luxury_sales', 'fresh_sales', 'dry_sales']
+NUMERIC_COLS = SALES_COLS + ['total_sales', 'predicted_customer_segmentation', 'cluster_category']
+TARGET = 'cluster_category'
+MAX_SEGMENT = 6
+
+# Known typos in the raw extracts
+COLUMN_FIXES = {'cluster_catgeory': 'cluster_category'}
+CITY_SPELLINGS = {
+    'batticaloa': 'Batticaloa',
+    'kalmunai': 'Kalmunai',
+    'MoraTuwa': 'Moratuwa',
+    'PeliyagodA': 'Peliyagoda',
+    'Trincomale': 'Trincomalee'
+}
+
+# Plain decimal numbers, optionally signed or in exponent form
+NUMBER_PATTERN = r'^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$'
+
+
+def read_raw(path):
+    """Read a raw extract with the multithreaded Arrow CSV parser"""
+    return pd.read_csv(path, engine='pyarrow')
+
+
+def to_numeric(values):
+    """Parse a column to numbers, ignoring thousands separators
+
+    Unparseable values become NaN. Text columns are parsed with Arrow
+    compute kernels rather than per-value Python conversion.
+    """
+    if values.dtype.kind in 'biuf':
+        return values
+    try:
+        text = pa.array(values, type=pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed Python objects, e.g. numbers and strings in one column
+        return pd.to_numeric(values.astype(str).str.replace(',', '', regex=False), errors='coerce')
+    text = pc.replace_substring(text, ',', '')
+    parsed = pc.cast(pc.if_else(pc.match_substring_regex(text, NUMBER_PATTERN), text, None), pa.float64())
+    return pd.Series(parsed.to_numpy(zero_copy_only=False), index=values.index, name=values.name)
+
+
+def normalise_columns(df):
+    """Strip column names and fix known misspellings in place"""
+    df.columns = df.columns.str.strip()
+    df.rename(columns=COLUMN_FIXES, inplace=True)
+    return df
+
+
+def coerce_types(df):
+    """Normalise column names and parse the numeric columns in place"""
+    normalise_columns(df)
+    for col in NUMERIC_COLS:
+        if col in df.columns:
+            df[col] = to_numeric(df[col])
+    return df
+
+
+def area_mapping(city_totals):
+    """Classify cities with above-median customer counts as Urban"""
+    return (city_totals > city_totals.median()).map({True: 'Urban', False: 'Suburban'}).to_dict()
+
+
+def sales_medians(sales, mask):
+    """Median of each sales column over the rows in mask"""
+    return {col: float(np.nanmedian(values[mask])) for col, values in sales.items()}
+
+
+class ParsedExtract:
+    """Typed columns and row masks of a raw extract, shared by clean() and streaming ingestion"""
+
+    def __init__(self, raw, max_segment=MAX_SEGMENT):
+        normalise_columns(raw)
+        self.raw = raw
+
+        # Factorise cities once: gives the missing mask, spelling fixes per
+        # distinct value and per-city counts without touching strings per row
+        self.city_codes, city_values = pd.factorize(raw['outlet_city'])
+        self.city_names = np.array([CITY_SPELLINGS.get(c, c) for c in city_values], dtype=object)
+
+        # Rows with an ID and a city; medians are taken over these, before
+        # the segment filter, as in the notebooks
+        self.valid = raw['Customer_ID'].notna().to_numpy() & (self.city_codes >= 0)
+        self.sales = {col: to_numeric(raw[col]).to_numpy(dtype='float64') for col in SALES_COLS}
+
+        self.target = None
+        self.keep = self.valid
+        if TARGET in raw.columns:
+            self.target = to_numeric(raw[TARGET]).to_numpy(dtype='float64')
+            self.keep = self.valid & (self.target <= max_segment)  # NaN segments compare False
+        self.rows = np.flatnonzero(self.keep)
+
+    def city_totals(self):
+        """Customers per (spelling-fixed) city among the kept rows"""
+        counts = np.bincount(self.city_codes[self.rows], minlength=len(self.city_names))
+        totals = pd.Series(counts, index=self.city_names).groupby(level=0).sum()
+        # Cities whose rows were all dropped are not in the notebooks' crosstab or its median
+        return totals[totals > 0]
+
+
+def clean(raw, medians=None, area_map=None, max_segment=MAX_SEGMENT):
+    """Clean a raw extract, building each output column exactly once
+
+    Drops rows without a customer ID or city, imputes missing sales with
+    the column median, drops segments above max_segment and adds Area and
+    total_sales, like the notebooks. Pass medians and area_map computed on
+    other data (e.g. the training extract) to reuse them.
+    """
+    parsed = ParsedExtract(raw, max_segment)
+    if medians is None:
+        medians = sales_medians(parsed.sales, parsed.valid)
+    rows = parsed.rows
+
+    out = {}
+    for col in parsed.raw.columns:
+        if col in parsed.sales:
+            values = parsed.sales[col][rows]
+            out[col] = np.where(np.isnan(values), medians[col], values)
+        elif col == TARGET:
+            out[col] = parsed.target[rows]
+        elif col == 'outlet_city':
+            out[col] = parsed.city_names[parsed.city_codes[rows]]
+        else:
+            out[col] = parsed.raw[col].to_numpy()[rows]
+    df = pd.DataFrame(out)
+
+    if area_map is None:
+        area_map = area_mapping(parsed.city_totals())
+    df['Area'] = df['outlet_city'].map(area_map)
+    df['total_sales'] = out['luxury_sales'] + out['fresh_sales'] + out['dry_sales']
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean a raw customer extract")
+    parser.add_argument('input', help="raw extract (e.g. traincsv.csv)")
+    parser.add_argument('output', help="cleaned CSV to write")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    raw = read_raw(args.input)
+    df = clean(raw)
+    df.to_csv(args.output, index=False)
+    print(f"✅ Cleaned {len(raw):,} rows into {len(df):,} in {time.perf_counter() - start:.1f}s. "
+          f"File saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import contextlib
+import json
+import threading
+import time
+
+# Sessions run in threads of one process and may append traces concurrently
+_trace_lock = threading.Lock()
+
+
+class RenderProfiler:
+    """Wall-clock timings of the stages of one dashboard rerun
+
+    Stages may nest; each record keeps its depth so the panel can indent it.
+    When disabled, stage() costs one context-manager call and records nothing.
+    Measurements that are themselves costly (payload sizes) are deferred with
+    measure_later() and run by finish(), after the rerun total is taken.
+    """
+
+    def __init__(self, enabled, started=None):
+        self.enabled = enabled
+        self.records = []
+        self.context = {}
+        self.started = time.perf_counter() if started is None else started
+        self.finished = None
+        self._depth = 0
+        self._deferred = []
+
+    @contextlib.contextmanager
+    def stage(self, name, **info):
+        """Time the enclosed block; extra fields (rows, bytes) may be set on the yielded record"""
+        if not self.enabled:
+            yield {}
+            return
+        record = dict(stage=name, depth=self._depth, **info)
+        self.records.append(record)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['ms'] = (time.perf_counter() - start) * 1000
+            self._depth -= 1
+
+    def add(self, name, ms, **info):
+        """Record a stage timed elsewhere, e.g. the script's module imports"""
+        if self.enabled:
+            self.records.append(dict(stage=name, depth=self._depth, ms=ms, **info))
+
+    def measure_later(self, record, field, measure):
+        """Set record[field] = measure() in finish(), outside every timed stage"""
+        if self.enabled:
+            self._deferred.append((record, field, measure))
+
+    def finish(self):
+        """Stop the rerun clock, then run the deferred measurements"""
+        if self.finished is None:
+            self.finished = time.perf_counter()
+        for record, field, measure in self._deferred:
+            record[field] = measure()
+        self._deferred = []
+
+    def total_ms(self):
+        end = time.perf_counter() if self.finished is None else self.finished
+        return (end - self.started) * 1000
+
+    def table(self):
+        """Rows for the timing panel, stage names indented by depth"""
+        return [{
+            'stage': ' ' * r['depth'] + r['stage'],
+            'ms': round(r.get('ms', float('nan')), 2),
+            'rows': r.get('rows'),
+            'bytes': r.get('bytes')
+        } for r in self.records]
+
+    def write_trace(self, path):
+        """Append this rerun and its context (snapshot version, filters, ...) as one JSON line"""
+        line = json.dumps(dict(self.context, ts=time.time(), total_ms=self.total_ms(), stages=self.records),
+                          default=str)
+        with _trace_lock, open(path, 'a') as f:
+            f.write(line + '\n')
@@ -0,0 +1,287 @@
+"""Local HTTP service returning a customer's segment and recommended offers in real time
+
+POST /score with one customer or {"customers": [...]}, each with the four
+model features (outlet_city as its code or its name) and optionally a
+Customer_ID. Concurrent requests are coalesced into one model call
+(dynamic batching). GET /metrics reports p50/p99 latency and batch sizes.
+
+    python scoring_service.py --model finalized_model.sav --scaler scaler.sav --port 8765
+    curl -d '{"luxury_sales": 1200, "fresh_sales": 800, "dry_sales": 5300, "outlet_city": "Kelaniya"}' \\
+        localhost:8765/score
+
+load_generator.py drives it offline.
+"""
+import argparse
+import collections
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import area_lookup
+import marketing
+import model_serving
+
+CITY_CODES = {city: code for code, city in area_lookup.OUTLET_CITY_MAP.items()}
+
+
+def recommendation(segment):
+    """Segment name, strategy and offers of a segment id"""
+    name = marketing.CLUSTER_MAPPING.get(segment)
+    strategy = marketing.MARKETING_STRATEGIES.get(name, {})
+    return {
+        'segment_name': name,
+        'strategy': strategy.get('primary'),
+        'channels': strategy.get('channels', []),
+        'offers': strategy.get('offers', []),
+        'timing': strategy.get('timing')
+    }
+
+
+RECOMMENDATIONS = {segment: recommendation(segment) for segment in marketing.CLUSTER_MAPPING}
+
+
+def parse_customers(body):
+    """Customer IDs and an (n, 4) feature array from a request body"""
+    customers = body['customers'] if isinstance(body, dict) and 'customers' in body else [body]
+    if not isinstance(customers, list) or not customers:
+        raise ValueError("expected a customer object or a non-empty 'customers' list")
+    features = np.empty((len(customers), len(model_serving.FEATURES)), dtype='float64')
+    ids = []
+    for i, customer in enumerate(customers):
+        if not isinstance(customer, dict):
+            raise ValueError(f"customer {i}: expected an object")
+        for j, feature in enumerate(model_serving.FEATURES):
+            if feature not in customer:
+                raise ValueError(f"customer {i}: missing '{feature}'")
+            value = customer[feature]
+            if feature == 'outlet_city' and isinstance(value, str):
+                if value not in CITY_CODES:
+                    raise ValueError(f"customer {i}: unknown outlet_city {value!r}")
+                value = CITY_CODES[value]
+            try:
+                features[i, j] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"customer {i}: '{feature}' must be a number") from None
+        ids.append(customer.get('Customer_ID'))
+    return ids, features
+
+
+class LatencyStats:
+    """Request latencies and batch sizes of the most recent requests"""
+
+    def __init__(self, window=10_000):
+        self._lock = threading.Lock()
+        self._latencies = collections.deque(maxlen=window)
+        self._batch_rows = collections.deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+
+    def record_request(self, seconds, rows):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.requests += 1
+            self.rows += rows
+
+    def record_batch(self, rows):
+        with self._lock:
+            self._batch_rows.append(rows)
+            self.batches += 1
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            batch_rows = np.array(self._batch_rows)
+            return {
+                'requests': self.requests,
+                'rows': self.rows,
+                'batches': self.batches,
+                'errors': self.errors,
+                'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+                'mean_batch_rows': float(batch_rows.mean()) if len(batch_rows) else None
+            }
+
+
+class _Pending:
+    __slots__ = ('features', 'done', 'result', 'error')
+
+    def __init__(self, features):
+        self.features = features
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DynamicBatcher:
+    """Coalesces concurrent predict calls into one model call
+
+    A single thread takes the first waiting request, then keeps collecting
+    more for up to max_wait_ms or until max_batch rows, and scores them all
+    with one model_serving.SegmentModel.predict_segments call.
+    """
+
+    def __init__(self, model, max_batch=1024, max_wait_ms=2.0, stats=None):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.stats = stats or LatencyStats()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="dynamic-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def predict(self, features):
+        """Segment ids and probabilities of an (n, 4) feature array; blocks until scored"""
+        pending = _Pending(features)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = len(batch[0].features)
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_batch:
+            try:
+                pending = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                break
+            batch.append(pending)
+            rows += len(pending.features)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                features = pd.DataFrame(np.concatenate([p.features for p in batch]), columns=model_serving.FEATURES)
+                segments, probabilities = self.model.predict_segments(features, max(len(features), 1))
+                self.stats.record_batch(len(features))
+                start = 0
+                for pending in batch:
+                    stop = start + len(pending.features)
+                    pending.result = (segments[start:stop], probabilities[start:stop])
+                    start = stop
+            except Exception as error:  # one bad batch must not stop the service
+                for pending in batch:
+                    pending.error = error
+            for pending in batch:
+                pending.done.set()
+
+
+class ScoringService:
+    """Segment and offers of customers, scored through a DynamicBatcher"""
+
+    def __init__(self, model, max_batch=1024, max_wait_ms=2.0):
+        self.stats = LatencyStats()
+        self.batcher = DynamicBatcher(model, max_batch, max_wait_ms, self.stats).start()
+
+    def score(self, body):
+        """Response body for a /score request body"""
+        ids, features = parse_customers(body)
+        segments, probabilities = self.batcher.predict(features)
+        results = []
+        for customer_id, segment, prob in zip(ids, segments.tolist(), probabilities.max(axis=1).tolist()):
+            result = {'Customer_ID': customer_id, 'segment': segment, 'probability': round(prob, 4)}
+            result.update(RECOMMENDATIONS.get(segment) or recommendation(segment))
+            results.append(result)
+        return {'results': results}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients can reuse one connection for many requests
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; Nagle would hold the body back for the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._send(200, self.server.service.stats.stats())
+        elif self.path == '/health':
+            self._send(200, {'status': 'ok'})
+        else:
+            self._send(404, {'error': f"unknown path {self.path}"})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        service = self.server.service
+        if self.path != '/score':
+            self._send(404, {'error': f"unknown path {self.path}"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            response = service.score(body)
+        except ValueError as error:  # includes malformed JSON
+            service.stats.record_error()
+            self._send(400, {'error': str(error)})
+            return
+        except Exception as error:
+            service.stats.record_error()
+            self._send(500, {'error': str(error)})
+            return
+        self._send(200, response)
+        service.stats.record_request(time.perf_counter() - start, len(response['results']))
+
+    def log_message(self, format, *args):
+        # No access log line per request; it would dominate the latency
+        pass
+
+
+def serve(service, host='127.0.0.1', port=8765):
+    """HTTP server for a ScoringService (port 0 picks a free port); call serve_forever() on it"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve customer segments and offers over HTTP")
+    parser.add_argument('--model', default='finalized_model.sav', help="pickled or joblib segment model")
+    parser.add_argument('--model-kind', default='nn', choices=list(model_serving.MODEL_KINDS))
+    parser.add_argument('--scaler', default='scaler.sav', help="StandardScaler fitted on training data (nn only)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=1024, help="most rows coalesced into one model call")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0,
+                        help="how long a request may wait for others to join its batch")
+    args = parser.parse_args(argv)
+
+    model = model_serving.load(args.model_kind, args.model, args.scaler)
+    server = serve(ScoringService(model, args.max_batch, args.max_wait_ms), args.host, args.port)
+    print(f"Serving {args.model_kind} segments on http://{args.host}:{server.server_port}/score")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# Dimensions the dashboard filters on and measures it reports
+DIMENSIONS = ['cluster_name', 'outlet_city', 'Area']
+MEASURES = ['luxury_sales', 'fresh_sales', 'dry_sales', 'total_sales']
+
+
+def build_cube(df):
+    """Pre-aggregate customer rows into (segment, city, area) cells"""
+    cells = df[DIMENSIONS].copy()
+    cells['rows'] = 1
+    cells['customers'] = df['Customer_ID'].notna().astype('int64')
+    for col in MEASURES:
+        # Accumulate in float64 even when the table stores float32
+        values = df[col].astype('float64')
+        cells[f'{col}_count'] = values.notna().astype('int64')
+        cells[f'{col}_sum'] = values
+
+    # Rows with a missing dimension can never pass the sidebar filters
+    cube = cells.groupby(DIMENSIONS, sort=True, observed=True).sum()
+    return cube.reset_index()
+
+
+def select(cube, segments, cities, areas):
+    """Return the cube cells matching the sidebar filter selection"""
+    mask = (
+        cube['cluster_name'].isin(segments) &
+        cube['outlet_city'].isin(cities) &
+        cube['Area'].isin(areas)
+    )
+    return cube[mask]
+
+
+def rollup(cells, by):
+    """Sum cube cells up to one or more dimensions"""
+    keys = [by] if isinstance(by, str) else list(by)
+    stats = cells.drop(columns=[d for d in DIMENSIONS if d not in keys])
+    return stats.groupby(by, sort=True, observed=True).sum()
+
+
+def totals(cells):
+    """Sum cube cells into a single row of statistics"""
+    return cells.drop(columns=DIMENSIONS).sum()
+
+
+def mean(stats, col):
+    """Mean of a measure from rolled-up statistics (NaN when empty)"""
+    count = stats[f'{col}_count']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return stats[f'{col}_sum'] / np.where(count > 0, count, np.nan)
+
+
+def counts(cells, dimension):
+    """Row counts per dimension value, largest first (like value_counts)"""
+    return rollup(cells, dimension)['rows'].sort_values(ascending=False, kind='stable')
+
+
+def _ranked(cells, dimension):
+    """Rows per (segment, value), grouped by segment and largest first within it"""
+    ranked = rollup(cells, ['cluster_name', dimension])['rows'].reset_index()
+    # Plain values, so categorical dimensions can be collected into lists
+    ranked[dimension] = ranked[dimension].astype(object)
+    # Two stable sorts keep ties in value order, like counts()
+    ranked = ranked.sort_values('rows', ascending=False, kind='stable')
+    return ranked.sort_values('cluster_name', kind='stable')
+
+
+def segment_summary(cells, top_k=3, response_rates=None, default_rate=0.0):
+    """Per-segment figures for the strategy and campaign panels in one pass
+
+    Indexed by segment name with rows, avg_total_sales, top_cities (up to
+    top_k, largest first), areas and area_rows (largest first) and
+    expected_responses (rows times the segment's response rate).
+    """
+    stats = rollup(cells, 'cluster_name')
+    summary = pd.DataFrame({'rows': stats['rows'], 'avg_total_sales': mean(stats, 'total_sales')})
+
+    cities = _ranked(cells, 'outlet_city').groupby('cluster_name', sort=False, observed=True).head(top_k)
+    summary['top_cities'] = cities.groupby('cluster_name', observed=True)['outlet_city'].agg(list)
+    areas = _ranked(cells, 'Area').groupby('cluster_name', observed=True)
+    summary['areas'] = areas['Area'].agg(list)
+    summary['area_rows'] = areas['rows'].agg(list)
+
+    rates = summary.index.map(lambda name: (response_rates or {}).get(name, default_rate))
+    summary['expected_responses'] = summary['rows'] * np.asarray(rates, dtype='float64')
+    return summary
@@ -0,0 +1,159 @@
+import itertools
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Snapshot versions are unique for the whole process, not per service: results
+# cached on a version must never be served for another service's snapshot
+_versions = itertools.count(1)
+
+
+class DataSnapshot:
+    """One loaded version of the customer table plus everything derived from it
+
+    Snapshots are shared by every session in the process, so neither the
+    frame, the cube nor the index may be modified after loading.
+    """
+    __slots__ = ('df', 'cube', 'index', 'version', 'loaded_at', 'nbytes')
+
+    def __init__(self, df, cube, index, version, loaded_at):
+        object.__setattr__(self, 'df', df)
+        object.__setattr__(self, 'cube', cube)
+        object.__setattr__(self, 'index', index)
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'loaded_at', loaded_at)
+        # Measured once: a deep memory_usage scans every string and is far too slow per rerun
+        object.__setattr__(self, 'nbytes', int(df.memory_usage(deep=True).sum()
+                                               + cube.memory_usage(deep=True).sum() + index.nbytes))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DataSnapshot is immutable")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+class SharedDataService:
+    """Process-wide holder of the current snapshot, read by all sessions
+
+    loader(current) is given the snapshot in use (None on the first load) and
+    must return a (df, cube, index) tuple, or None if current is still up to
+    date. Only the very first load blocks a session. After that, the source
+    is revalidated in a background refresher thread every ttl seconds or on
+    refresh(), and a new snapshot is swapped in atomically while sessions
+    keep reading the previous one (stale-while-revalidate). An unchanged
+    source keeps the snapshot and its version, so nothing derived from it is
+    rebuilt. A failed reload keeps the previous snapshot and is reported in
+    last_error. close() stops the refresher for good.
+    """
+
+    def __init__(self, loader, ttl):
+        self._loader = loader
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._snapshot = None
+        self.checked_at = None
+        self.checks = 0
+        self.refreshing = False
+        self.last_error = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        with self._load_lock:
+            self.refreshing = True
+            try:
+                loaded = self._loader(self._snapshot)
+            finally:
+                self.refreshing = False
+            self.checked_at = time.time()
+            self.checks += 1
+            self.last_error = None
+            if loaded is None and self._snapshot is not None:
+                return self._snapshot
+            df, cube, index = loaded
+            # Readers hold on to the old snapshot; only the reference is swapped
+            self._snapshot = DataSnapshot(df, cube, index, next(_versions), time.time())
+            self.misses += 1
+            return self._snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self._ttl)
+            self._wakeup.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self._load()
+            except Exception as e:
+                self.last_error = e
+                logger.warning("Background refresh failed, serving the previous snapshot: %s", e)
+
+    def start(self):
+        """Start the background refresher thread (once); returns self"""
+        with self._lock:
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._run, name='data-refresher', daemon=True)
+                self._thread.start()
+        return self
+
+    def get(self):
+        """Return the current snapshot; blocks only if nothing has been loaded yet"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    return self._load()
+        elif self._thread is None and time.time() - self.checked_at >= self._ttl:
+            # Without a running refresher, revalidate in the background on first stale read
+            self.refresh()
+        self.hits += 1
+        return snapshot
+
+    def close(self, timeout=None):
+        """Stop the refresher thread, waiting up to timeout for a reload in progress"""
+        self._stop.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def refresh(self):
+        """Reload in the background now; sessions keep the current snapshot meanwhile"""
+        self.start()
+        self._wakeup.set()
+
+    def stats(self):
+        """Memory, freshness and hit-rate figures for the readout"""
+        snapshot = self._snapshot
+        requests = self.hits + self.misses
+        return {
+            'version': snapshot.version if snapshot else None,
+            'rows': len(snapshot.df) if snapshot else 0,
+            'snapshot_mb': snapshot.nbytes / (1 << 20) if snapshot else 0.0,
+            'age': time.time() - snapshot.loaded_at if snapshot else None,
+            'checked_age': time.time() - self.checked_at if self.checked_at else None,
+            'checks': self.checks,
+            'refreshing': self.refreshing,
+            'last_error': str(self.last_error) if self.last_error else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+            'peak_rss_mb': peak_rss_mb()
+        }
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+import pyarrow.feather as feather
+import requests
+
+import preprocessing
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = 'customers.arrow'
+META_FILE = 'customers.json'
+CHUNK_SIZE = 1 << 20  # 1 MiB
+
+def read_meta(directory):
+    """Return the metadata of the current snapshot ({} if there is none)"""
+    try:
+        with open(os.path.join(directory, META_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(directory, meta):
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(directory, META_FILE))
+
+
+def write_snapshot(directory, df, meta):
+    """Atomically persist a cleaned frame as an uncompressed Arrow file"""
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.arrow')
+    os.close(fd)
+    try:
+        # Uncompressed so loading is a plain read with no decoding step
+        feather.write_feather(df.reset_index(drop=True), tmp, compression='uncompressed')
+        os.replace(tmp, os.path.join(directory, SNAPSHOT_FILE))
+    except BaseException:
+        os.remove(tmp)
+        raise
+    _write_meta(directory, dict(meta, rows=len(df), updated=time.time()))
+
+
+def load_snapshot(directory):
+    """Load the snapshot into a pandas frame (None if there is none)
+
+    The conversion copies every column onto the heap, so the frame costs its
+    full size in memory whatever way the file is read.
+    """
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    if not os.path.exists(path):
+        return None
+    return feather.read_table(path).to_pandas()
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fetch_http(source, meta, directory, timeout):
+    """Download the source to a temp file unless the server reports it unchanged"""
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
+    with requests.get(source, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            return None, meta
+        response.raise_for_status()
+
+        # Stream to disk while hashing instead of holding the body in memory
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.csv')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        return tmp, {
+            'source': source,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': digest.hexdigest()
+        }
+
+
+def _fetch_local(source, meta):
+    """Use a local file directly unless its size and mtime are unchanged"""
+    stat = os.stat(source)
+    if meta.get('mtime') == stat.st_mtime and meta.get('size') == stat.st_size:
+        return None, meta
+    return source, {
+        'source': source,
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'sha256': _hash_file(source)
+    }
+
+
+def refresh(source, directory, timeout=30, reload=True):
+    """Return (customer table, changed), re-downloading only when the source changed
+
+    source may be an http(s) URL or a local CSV path. changed tells whether
+    the snapshot content differs from what was there before; with
+    reload=False an unchanged snapshot is not read and the table is None.
+
+    If the source cannot be reached, the error is raised when reload=False,
+    so a caller holding the previous table can report it. Otherwise an
+    existing snapshot is served as-is (unchanged).
+    """
+    os.makedirs(directory, exist_ok=True)
+    meta = read_meta(directory)
+    if meta.get('source') != source or not os.path.exists(os.path.join(directory, SNAPSHOT_FILE)):
+        meta = {}
+
+    is_http = source.startswith(('http://', 'https://'))
+    try:
+        if is_http:
+            path, new_meta = _fetch_http(source, meta, directory, timeout)
+        else:
+            path, new_meta = _fetch_local(source, meta)
+    except (requests.RequestException, OSError) as e:
+        if not meta or not reload:
+            raise
+        logger.warning("Serving existing snapshot, source unavailable: %s", e)
+        return load_snapshot(directory), False
+
+    changed = False
+    try:
+        if path is not None and new_meta['sha256'] == meta.get('sha256'):
+            # Content is identical, only the validators changed
+            _write_meta(directory, dict(meta, **new_meta))
+        elif path is not None:
+            df = preprocessing.coerce_types(preprocessing.read_raw(path))
+            write_snapshot(directory, df, new_meta)
+            changed = True
+    finally:
+        if is_http and path is not None:
+            os.remove(path)
+
+    if not changed and not reload:
+        return None, False
+    return load_snapshot(directory), changed
@@ -0,0 +1,200 @@
+"""Clean raw extracts larger than memory
+
+Out-of-core version of preprocessing.py. The first pass streams every
+extract in chunks and gathers mergeable statistics (sales medians and
+customers per city). The second pass cleans each chunk with those
+statistics and writes it as one partition of the output directory.
+
+    python streaming_ingest.py traincsv.csv --output cleaned_train/ --chunk-size 500000
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import preprocessing
+
+
+class QuantileSketch:
+    """Mergeable quantile summary of a numeric column
+
+    Keeps exact value counts while there are at most max_distinct distinct
+    values, so quantiles match numpy exactly. Beyond that it collapses into
+    logarithmic buckets whose representative is within relative_accuracy
+    of every value in the bucket.
+    """
+
+    MIN_MAGNITUDE = 1e-6
+
+    def __init__(self, max_distinct=1_000_000, relative_accuracy=0.005):
+        self.max_distinct = max_distinct
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.exact = True
+        self.counts = pd.Series(dtype='int64')
+
+    def _bucket_keys(self, values):
+        # Signed bucket index, monotonic in value; 0 holds values near zero
+        magnitude = np.maximum(np.abs(values), self.MIN_MAGNITUDE)
+        offset = math.ceil(math.log(self.MIN_MAGNITUDE, self.gamma)) - 1
+        keys = np.ceil(np.log(magnitude) / np.log(self.gamma)) - offset
+        keys[np.abs(values) < self.MIN_MAGNITUDE] = 0
+        return (np.sign(values) * keys).astype('int64')
+
+    def _bucket_values(self, keys):
+        offset = math.ceil(math.log(self.MIN_MAGNITUDE, self.gamma)) - 1
+        keys = np.asarray(keys, dtype='float64')
+        values = 2 * self.gamma ** (np.abs(keys) + offset) / (self.gamma + 1)
+        return np.where(keys == 0, 0.0, np.sign(keys) * values)
+
+    def _collapse(self):
+        values = self.counts.index.to_numpy(dtype='float64')
+        self.counts = self.counts.groupby(self._bucket_keys(values)).sum()
+        self.exact = False
+
+    def _add(self, counts):
+        self.counts = self.counts.add(counts, fill_value=0).astype('int64')
+        if self.exact and len(self.counts) > self.max_distinct:
+            self._collapse()
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        if not self.exact:
+            values = self._bucket_keys(values)
+        self._add(pd.Series(values).value_counts())
+
+    def merge(self, other):
+        if self.exact and not other.exact:
+            self._collapse()
+        counts = other.counts
+        if other.exact and not self.exact:
+            counts = counts.groupby(self._bucket_keys(counts.index.to_numpy(dtype='float64'))).sum()
+        self._add(counts)
+
+    def quantile(self, q):
+        """q-quantile with numpy's default (linear) interpolation"""
+        counts = self.counts.sort_index()
+        total = int(counts.sum())
+        if total == 0:
+            return float('nan')
+        cumulative = counts.cumsum().to_numpy()
+        values = counts.index.to_numpy(dtype='float64')
+        if not self.exact:
+            values = self._bucket_values(counts.index)
+
+        position = q * (total - 1)
+        lo, hi = math.floor(position), math.ceil(position)
+        lo_value = values[np.searchsorted(cumulative, lo, side='right')]
+        hi_value = values[np.searchsorted(cumulative, hi, side='right')]
+        return float(lo_value + (hi_value - lo_value) * (position - lo))
+
+    def median(self):
+        return self.quantile(0.5)
+
+
+class IngestStats:
+    """Mergeable first-pass statistics of one or more raw extracts"""
+
+    def __init__(self, max_distinct=1_000_000, relative_accuracy=0.005):
+        self.sketches = {col: QuantileSketch(max_distinct, relative_accuracy) for col in preprocessing.SALES_COLS}
+        self.city_totals = pd.Series(dtype='int64')
+        self.rows_in = 0
+
+    def update(self, parsed):
+        for col, sketch in self.sketches.items():
+            sketch.update(parsed.sales[col][parsed.valid])
+        self.city_totals = self.city_totals.add(parsed.city_totals(), fill_value=0).astype('int64')
+        self.rows_in += len(parsed.raw)
+
+    def merge(self, other):
+        for col, sketch in self.sketches.items():
+            sketch.merge(other.sketches[col])
+        self.city_totals = self.city_totals.add(other.city_totals, fill_value=0).astype('int64')
+        self.rows_in += other.rows_in
+
+    def medians(self):
+        return {col: sketch.median() for col, sketch in self.sketches.items()}
+
+    def exact(self):
+        return all(sketch.exact for sketch in self.sketches.values())
+
+    def area_map(self):
+        return preprocessing.area_mapping(self.city_totals)
+
+
+def read_chunks(path, chunk_size):
+    # Raw columns are read as text so every chunk gets the same types
+    return pd.read_csv(path, chunksize=chunk_size, dtype=str)
+
+
+def gather_stats(paths, chunk_size, max_distinct=1_000_000, relative_accuracy=0.005):
+    """First pass: statistics over all extracts, one chunk in memory at a time"""
+    stats = IngestStats(max_distinct, relative_accuracy)
+    for path in paths:
+        for chunk in read_chunks(path, chunk_size):
+            stats.update(preprocessing.ParsedExtract(chunk))
+    return stats
+
+
+def write_partitions(paths, output_dir, stats, chunk_size):
+    """Second pass: clean every chunk with the global statistics
+
+    Partitions and statistics of an earlier run in output_dir are removed
+    first, so a smaller rerun never leaves stale higher-numbered parts.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(output_dir, 'part-*.csv')) + [os.path.join(output_dir, '_stats.json')]:
+        if os.path.exists(stale):
+            os.remove(stale)
+    medians, area_map = stats.medians(), stats.area_map()
+    part = rows_out = 0
+    for path in paths:
+        for chunk in read_chunks(path, chunk_size):
+            cleaned = preprocessing.clean(chunk, medians=medians, area_map=area_map)
+            ids = pd.to_numeric(cleaned['Customer_ID'], errors='coerce')
+            if ids.notna().all():
+                cleaned['Customer_ID'] = ids
+            cleaned.to_csv(os.path.join(output_dir, f'part-{part:05d}.csv'), index=False)
+            part += 1
+            rows_out += len(cleaned)
+    return part, rows_out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean raw customer extracts in chunks")
+    parser.add_argument('inputs', nargs='+', help="raw extracts (e.g. traincsv.csv)")
+    parser.add_argument('--output', required=True, help="directory for the cleaned partitions")
+    parser.add_argument('--chunk-size', type=int, default=500_000, help="rows read per chunk")
+    parser.add_argument('--max-distinct', type=int, default=1_000_000,
+                        help="distinct sales values kept exactly before medians become approximate")
+    parser.add_argument('--relative-accuracy', type=float, default=0.005,
+                        help="median accuracy once approximate")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    stats = gather_stats(args.inputs, args.chunk_size, args.max_distinct, args.relative_accuracy)
+    parts, rows_out = write_partitions(args.inputs, args.output, stats, args.chunk_size)
+
+    # Keep the statistics with the output so scoring can reuse them
+    with open(os.path.join(args.output, '_stats.json'), 'w') as f:
+        json.dump({
+            'inputs': args.inputs,
+            'rows_in': stats.rows_in,
+            'rows_out': rows_out,
+            'medians': stats.medians(),
+            'medians_exact': stats.exact(),
+            'area_map': stats.area_map(),
+            'city_totals': stats.city_totals.to_dict()
+        }, f, indent=2)
+
+    print(f"✅ Cleaned {stats.rows_in:,} rows into {rows_out:,} across {parts} partitions "
+          f"in {time.perf_counter() - start:.1f}s. Output: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
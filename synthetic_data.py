@@ -0,0 +1,141 @@
+"""Synthetic customer tables with the real schema, for benchmarks and offline runs
+
+    python synthetic_data.py 1000000 customers.csv --segment-skew 1.0 --city-skew 0.8
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+import area_lookup
+import customer_schema
+import preprocessing
+
+SEGMENTS = [1, 2, 3, 4, 5, 6]
+
+# Mean (luxury, fresh, dry) spend per segment, loosely following the cluster profiles
+SEGMENT_SPEND = {
+    1: (900, 2500, 9000),
+    2: (700, 9000, 2500),
+    3: (2500, 5000, 5000),
+    4: (600, 2000, 8000),
+    5: (1800, 4000, 4000),
+    6: (1200, 11000, 3000)
+}
+
+
+def _weights(n, skew):
+    """Zipf-like weights over n categories; skew 0 is uniform"""
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+def customers(rows, segment_skew=0.0, city_skew=0.0, seed=0):
+    """Scored customer table as published for the dashboard
+
+    Columns match predicted_customer_segmentations.csv: Customer_ID,
+    outlet_city, luxury/fresh/dry/total sales, predicted_customer_segmentation
+    and Area (median split of customers per city, as in the notebooks).
+    """
+    rng = np.random.default_rng(seed)
+    cities = np.array(list(area_lookup.OUTLET_CITY_MAP.values()), dtype=object)
+    segments = rng.choice(SEGMENTS, rows, p=_weights(len(SEGMENTS), segment_skew))
+    city_codes = rng.choice(len(cities), rows, p=_weights(len(cities), city_skew))
+
+    spend = np.array([SEGMENT_SPEND[s] for s in SEGMENTS], dtype='float64')[segments - 1]
+    sales = np.round(rng.gamma(4.0, spend / 4.0), 2)
+
+    df = pd.DataFrame({
+        'Customer_ID': np.arange(1, rows + 1),
+        'outlet_city': pd.Categorical.from_codes(city_codes, categories=cities),
+        'luxury_sales': sales[:, 0],
+        'fresh_sales': sales[:, 1],
+        'dry_sales': sales[:, 2],
+        'predicted_customer_segmentation': segments
+    })
+    df['total_sales'] = df['luxury_sales'] + df['fresh_sales'] + df['dry_sales']
+    area_map = preprocessing.area_mapping(df['outlet_city'].value_counts())
+    df['Area'] = df['outlet_city'].map(area_map)
+    return df
+
+
+def scoring_extract(df):
+    """Cleaned test extract (outlet codes, no predictions) for batch_scoring.py"""
+    codes = {city: code for code, city in area_lookup.OUTLET_CITY_MAP.items()}
+    return pd.DataFrame({
+        'Customer_ID': df['Customer_ID'],
+        'luxury_sales': df['luxury_sales'],
+        'fresh_sales': df['fresh_sales'],
+        'dry_sales': df['dry_sales'],
+        'outlet_city': df['outlet_city'].map(codes).astype('int64')
+    })
+
+
+def write_csv(df, path):
+    """Write a frame with Arrow's CSV writer (much faster than to_csv at 10M rows)"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Plain strings rather than dictionary columns, like a published sheet
+    table = table.cast(customer_schema.plain_schema(table.schema))
+    pacsv.write_csv(table, path, pacsv.WriteOptions(quoting_style='none'))
+
+
+class StandInScaler:
+    """Standardises features like the training StandardScaler"""
+
+    def __init__(self, mean, scale):
+        self.mean = mean
+        self.scale = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype='float64') - self.mean) / self.scale
+
+
+class StandInModel:
+    """Nearest-centroid classifier returning class probabilities, like the Keras NN
+
+    Only a cheap stand-in so the scoring path can be benchmarked offline;
+    pass the real artifacts to measure the real model.
+    """
+
+    def __init__(self, centroids):
+        self.centroids = centroids
+
+    def predict(self, X):
+        distances = ((X[:, None, :] - self.centroids[None, :, :]) ** 2).sum(axis=2)
+        logits = -distances
+        logits -= logits.max(axis=1, keepdims=True)
+        prob = np.exp(logits)
+        return prob / prob.sum(axis=1, keepdims=True)
+
+
+def stand_in_artifacts(df, features):
+    """Fit the stand-in scaler and model on a customer table"""
+    codes = {city: code for code, city in area_lookup.OUTLET_CITY_MAP.items()}
+    X = df[features].assign(outlet_city=df['outlet_city'].map(codes).astype('float64')).to_numpy(dtype='float64')
+    scaler = StandInScaler(X.mean(axis=0), np.where(X.std(axis=0) > 0, X.std(axis=0), 1.0))
+    scaled = scaler.transform(X)
+    segments = df['predicted_customer_segmentation'].to_numpy()
+    centroids = np.array([scaled[segments == s].mean(axis=0) if (segments == s).any() else np.zeros(X.shape[1])
+                          for s in SEGMENTS])
+    return StandInModel(centroids), scaler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic customer table")
+    parser.add_argument('rows', type=int)
+    parser.add_argument('output', help="CSV to write")
+    parser.add_argument('--segment-skew', type=float, default=0.0, help="Zipf exponent over segments (0 = uniform)")
+    parser.add_argument('--city-skew', type=float, default=0.0, help="Zipf exponent over cities (0 = uniform)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scoring', action='store_true', help="write a scoring extract instead (outlet codes)")
+    args = parser.parse_args(argv)
+
+    df = customers(args.rows, args.segment_skew, args.city_skew, args.seed)
+    write_csv(scoring_extract(df) if args.scoring else df, args.output)
+    print(f"✅ Wrote {args.rows:,} synthetic customers. File saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
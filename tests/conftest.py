@@ -0,0 +1,24 @@
+import os
+import pickle
+import sys
+
+import pytest
+
+# The modules live at the repository root, next to the dashboard script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def stand_in(tmp_path_factory):
+    """Paths of a pickled stand-in model and scaler, fitted on synthetic customers"""
+    import batch_scoring
+    import synthetic_data
+
+    directory = tmp_path_factory.mktemp('artifacts')
+    sample = synthetic_data.customers(5_000, seed=0)
+    paths = {}
+    for name, artifact in zip(('model', 'scaler'), synthetic_data.stand_in_artifacts(sample, batch_scoring.FEATURES)):
+        paths[name] = str(directory / f'{name}.sav')
+        with open(paths[name], 'wb') as f:
+            pickle.dump(artifact, f)
+    return paths
@@ -0,0 +1,91 @@
+import io
+
+import pandas as pd
+import pytest
+
+import batch_scoring
+import fingerprints
+import synthetic_data
+
+
+def score(stand_in, input_path, output, incremental=False):
+    return batch_scoring.score_file(input_path, output, stand_in['model'], stand_in['scaler'], chunk_size=700,
+                                    batch_size=256, incremental=incremental, log=io.StringIO())
+
+
+def read(path):
+    return pd.read_csv(path).sort_values('Customer_ID').reset_index(drop=True)
+
+
+@pytest.fixture
+def extracts(tmp_path):
+    """A first extract and a second one with changed, deleted and new customers"""
+    first = synthetic_data.scoring_extract(synthetic_data.customers(3_000, seed=1))
+    second = first.copy()
+    changed = second['Customer_ID'] % 10 == 0
+    second.loc[changed, 'fresh_sales'] *= 3
+    second.loc[changed, 'dry_sales'] /= 3
+    second = second[second['Customer_ID'] % 7 != 0]
+    new = synthetic_data.scoring_extract(synthetic_data.customers(200, seed=2))
+    new['Customer_ID'] += 10_000
+    second = pd.concat([second, new], ignore_index=True)
+
+    paths = {name: str(tmp_path / f'{name}.csv') for name in ('first', 'second')}
+    first.to_csv(paths['first'], index=False)
+    second.to_csv(paths['second'], index=False)
+    ids = first['Customer_ID']
+    return paths, {
+        'changed': set(ids[changed & (ids % 7 != 0)]),
+        'deleted': set(ids[ids % 7 == 0]),
+        'new': set(new['Customer_ID'])
+    }
+
+
+def test_incremental_run_matches_full_rescore(stand_in, extracts, tmp_path):
+    paths, expected = extracts
+    output = str(tmp_path / 'scored.csv')
+    assert score(stand_in, paths['first'], output) == 3_000
+    before = read(output).set_index('Customer_ID')['predicted_customer_segmentation']
+
+    # Only new and changed customers reach the model
+    rescored = score(stand_in, paths['second'], output, incremental=True)
+    assert rescored == len(expected['changed']) + len(expected['new'])
+
+    full = str(tmp_path / 'full.csv')
+    score(stand_in, paths['second'], full)
+    pd.testing.assert_frame_equal(read(output), read(full))
+
+    # Changed customers got new predictions rather than their previous ones
+    after = read(output).set_index('Customer_ID')['predicted_customer_segmentation']
+    changed = sorted(expected['changed'])
+    assert (after[changed] != before[changed]).any()
+
+    ids = set(after.index)
+    assert not ids & expected['deleted']
+    assert expected['new'] <= ids
+
+
+def test_tracker_classifies_customers(stand_in, extracts, tmp_path):
+    paths, expected = extracts
+    output = str(tmp_path / 'scored.csv')
+    score(stand_in, paths['first'], output)
+    digest = fingerprints.artifact_digest(stand_in['model'], stand_in['scaler'])
+    previous = fingerprints.load_fingerprints(output + batch_scoring.FINGERPRINT_SUFFIX, digest)
+
+    tracker = fingerprints.ChangeTracker(previous, batch_scoring.FEATURES)
+    pending = tracker.filter(pd.read_csv(paths['second']))
+
+    assert set(pending['Customer_ID']) == expected['changed'] | expected['new']
+    assert (tracker.new, tracker.changed, tracker.deleted) == \
+        (len(expected['new']), len(expected['changed']), len(expected['deleted']))
+    # Unchanged customers keep their previous prediction
+    assert not set(tracker.unchanged_ids()) & (expected['changed'] | expected['deleted'])
+
+
+def test_changed_artifacts_invalidate_fingerprints(stand_in, extracts, tmp_path):
+    paths, _ = extracts
+    output = str(tmp_path / 'scored.csv')
+    score(stand_in, paths['first'], output)
+
+    assert fingerprints.load_fingerprints(output + batch_scoring.FINGERPRINT_SUFFIX, 'other artifacts') is None
+    assert fingerprints.load_fingerprints(str(tmp_path / 'missing.arrow'), 'x') is None
@@ -0,0 +1,62 @@
+import multiprocessing
+
+import pytest
+
+import benchmark
+import marketing
+
+
+@pytest.fixture(scope='module')
+def workdir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('bench'))
+    benchmark.generate((2_000, path, 0.5, 0.8, 0))
+    return path
+
+
+def options(**overrides):
+    return dict({'repeat': 1, 'compact': False, 'model': None, 'scaler': None, 'workers': 1}, **overrides)
+
+
+def test_scoring_case_with_worker_pool(workdir):
+    # Each case runs in its own process; scoring with workers=2 starts a pool inside it
+    context = multiprocessing.get_context('spawn')
+    result = benchmark.in_fresh_process(context, benchmark.run_case,
+                                        ('scoring', 2_000, workdir, options(workers=2)))
+
+    assert result['path'] == 'scoring'
+    assert result['stages']['score']['seconds'] > 0
+
+
+def test_dashboard_case_goes_through_the_dashboard_calls(workdir, monkeypatch):
+    calls = []
+    for name in ('prepare', 'kpis', 'scatter_sample', 'campaign_projection'):
+        original = getattr(benchmark.analytics, name)
+        monkeypatch.setattr(benchmark.analytics, name,
+                            lambda *args, _name=name, _fn=original: calls.append(_name) or _fn(*args))
+    result = benchmark.run_case(('dashboard', 2_000, workdir, options()))
+
+    assert list(result['stages']) == ['parse', 'load', 'prepare', 'filter', 'views', 'rerun']
+    assert set(calls) == {'prepare', 'kpis', 'scatter_sample', 'campaign_projection'}
+
+
+def test_selections_use_the_segment_names(workdir):
+    df, _, _ = benchmark.analytics.prepare(benchmark.snapshot_store.refresh(
+        f'{workdir}/customers.csv', f'{workdir}/names')[0])
+
+    for segments, _, _ in benchmark.selections(df):
+        assert set(segments) <= set(marketing.CLUSTER_MAPPING.values())
+
+
+def test_failed_case_raises():
+    context = multiprocessing.get_context('spawn')
+    with pytest.raises(RuntimeError, match="Benchmark case failed"):
+        benchmark.in_fresh_process(context, benchmark.run_case, ('scoring', 10, '/nonexistent', options()))
+
+
+def test_compare_flags_slower_stages():
+    baseline = {'results': [{'path': 'dashboard', 'rows': 10, 'peak_rss_mb': 100.0,
+                             'stages': {'load': {'seconds': 1.0}, 'filter': {'seconds': 1.0}}}]}
+    results = [{'path': 'dashboard', 'rows': 10, 'peak_rss_mb': 100.0,
+                'stages': {'load': {'seconds': 1.5}, 'filter': {'seconds': 1.1}}}]
+
+    assert benchmark.compare(results, baseline, 0.2) == ["dashboard/10/load: 1 -> 1.5 (1.50x)"]
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import bitmap_index
+import filter_cache
+
+DIMENSIONS = ['cluster_name', 'outlet_city', 'Area']
+SEGMENTS = ['Balanced', 'Bulk Dry', 'Fresh-Focused', 'Luxury']
+CITIES = ['Colombo', 'Kandy', 'Galle', 'Jaffna', 'Matara']
+AREAS = ['Urban', 'Sub Urban']
+
+
+def table(rows, seed=0, categorical=False):
+    rng = np.random.default_rng(seed)
+
+    def column(values, missing):
+        col = pd.Series(rng.choice(values, size=rows), dtype=object)
+        col[rng.random(rows) < missing] = np.nan
+        return col.astype('category') if categorical else col
+
+    return pd.DataFrame({
+        'cluster_name': column(SEGMENTS, 0.05),
+        'outlet_city': column(CITIES, 0.02),
+        'Area': column(AREAS, 0.0),
+        'total_sales': rng.random(rows)
+    })
+
+
+def expected_mask(df, selection):
+    mask = np.ones(len(df), dtype=bool)
+    for dim, values in selection.items():
+        if values is not None:
+            mask &= df[dim].isin(values).to_numpy()
+    return mask
+
+
+SELECTIONS = [
+    {},
+    {'cluster_name': ['Luxury']},
+    {'cluster_name': ['Luxury', 'Balanced', 'Bulk Dry']},
+    {'cluster_name': SEGMENTS, 'outlet_city': None, 'Area': ['Urban']},
+    {'cluster_name': ['Fresh-Focused'], 'outlet_city': ['Kandy', 'Galle'], 'Area': ['Sub Urban']},
+    {'outlet_city': CITIES[:4]},
+    {'cluster_name': []},
+    {'cluster_name': ['Unknown segment']},
+    {'cluster_name': ['Luxury', 'Unknown segment'], 'outlet_city': ['Nowhere', 'Colombo']},
+    {'Area': ['Urban'], 'outlet_city': ['Jaffna'], 'cluster_name': ['Balanced']},
+]
+
+
+@pytest.mark.parametrize('categorical', [False, True])
+@pytest.mark.parametrize('rows', [1, 63, 64, 1_000, 4_099])
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_query_matches_pandas_mask(selection, rows, categorical):
+    df = table(rows, categorical=categorical)
+    index = bitmap_index.BitmapIndex(df, DIMENSIONS)
+    expected = expected_mask(df, selection)
+
+    row_set = index.rows(selection)
+    assert index.count(selection) == expected.sum()
+    assert row_set.count == expected.sum()
+    np.testing.assert_array_equal(row_set.mask(), expected)
+    pd.testing.assert_frame_equal(row_set.take(df), df[expected])
+
+
+def test_missing_values_never_match():
+    df = table(2_000, seed=1)
+    index = bitmap_index.BitmapIndex(df, DIMENSIONS)
+    # Every known value selected: only the rows with a missing segment drop out
+    assert index.count({'cluster_name': SEGMENTS}) == df['cluster_name'].notna().sum()
+    assert index.count({'cluster_name': [np.nan]}) == 0
+
+
+def test_popcount_matches_unpacked_bits():
+    words = np.random.default_rng(2).integers(0, 2 ** 63, size=100, dtype=np.uint64)
+    assert bitmap_index.popcount(words) == np.unpackbits(words.view(np.uint8)).sum()
+
+
+@pytest.mark.parametrize('density', [0.0, 0.001, 0.02, 0.5, 1.0])
+def test_row_set_representations(density):
+    rng = np.random.default_rng(3)
+    mask = rng.random(10_001) < density
+    from_mask = filter_cache.RowSet.from_mask(mask)
+    packed = bitmap_index._pack(mask)
+    from_bits = filter_cache.RowSet.from_bits(packed, len(mask), bitmap_index.popcount(packed))
+
+    for row_set in (from_mask, from_bits):
+        assert row_set.count == mask.sum()
+        # Sparse selections keep positions, dense ones a bitmap
+        assert (row_set.positions is not None) == (mask.sum() * 4 <= len(mask) // 8 + 1)
+        np.testing.assert_array_equal(row_set.mask(), mask)
+        chunks = list(row_set.chunks(1_000))
+        assert all(len(chunk) <= 1_000 for chunk in chunks)
+        positions = np.concatenate(chunks) if chunks else np.array([], dtype=int)
+        np.testing.assert_array_equal(positions, np.flatnonzero(mask))
+
+
+def test_row_set_intersection_across_dimensions():
+    df = table(5_000, seed=4)
+    index = bitmap_index.BitmapIndex(df, DIMENSIONS)
+    segments = index.rows({'cluster_name': ['Luxury', 'Balanced']})
+    cities = index.rows({'outlet_city': ['Colombo']})
+    both = index.rows({'cluster_name': ['Luxury', 'Balanced'], 'outlet_city': ['Colombo']})
+
+    np.testing.assert_array_equal(both.mask(), segments.mask() & cities.mask())
+    assert both.count == (segments.mask() & cities.mask()).sum()
+
+
+def test_filter_cache_keeps_versions_apart():
+    cache = filter_cache.FilterCache(1 << 20)
+    old = filter_cache.RowSet.from_mask(np.ones(10, dtype=bool))
+    new = filter_cache.RowSet.from_mask(np.ones(20, dtype=bool))
+    selection = (None, ('Colombo',), None)
+
+    assert cache.get(1, selection, lambda: old) is old
+    # The same selection on a newer snapshot is recomputed, and the old entry dropped
+    assert cache.get(2, selection, lambda: new) is new
+    assert cache.stats()['entries'] == 1
+
+    # A reader still on the old snapshot gets its own rows, which are not cached
+    assert cache.get(1, selection, lambda: old) is old
+    assert cache.get(2, selection, lambda: None) is new
+    assert cache.stats()['entries'] == 1
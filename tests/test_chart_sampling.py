@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import chart_sampling
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    keys = rng.choice(['Balanced', 'Bulk Dry', 'Luxury', None], size=50_000, p=[0.7, 0.25, 0.0001, 0.0499])
+    return pd.DataFrame({'cluster_name': keys, 'total_sales': rng.random(50_000)})
+
+
+def test_sample_keeps_group_shares(frame):
+    sample = chart_sampling.stratified_sample(frame, 'cluster_name', 1_000)
+    sizes = frame['cluster_name'].value_counts()
+    picked = sample['cluster_name'].value_counts()
+
+    for key, size in sizes.items():
+        assert picked[key] == max(1, int(size * 1_000 / len(frame)))
+    # Rows without a segment are never drawn, and rows keep their table order
+    assert sample['cluster_name'].notna().all()
+    assert sample.index.is_monotonic_increasing
+
+
+def test_sample_is_deterministic_and_ignores_dtype(frame):
+    plain = chart_sampling.stratified_sample(frame, 'cluster_name', 1_000, seed=3)
+    categorical = chart_sampling.stratified_sample(frame.astype({'cluster_name': 'category'}), 'cluster_name',
+                                                   1_000, seed=3)
+
+    pd.testing.assert_index_equal(plain.index, chart_sampling.stratified_sample(frame, 'cluster_name', 1_000,
+                                                                               seed=3).index)
+    pd.testing.assert_index_equal(plain.index, categorical.index)
+
+
+def test_small_selection_is_returned_whole(frame):
+    small = frame.head(100)
+    assert chart_sampling.stratified_sample(small, 'cluster_name', 1_000) is small
+
+
+def test_histogram_ignores_nan():
+    centers, widths, counts = chart_sampling.histogram([1.0, 2.0, np.nan, 3.0], nbins=2)
+    assert counts.sum() == 3
+    assert len(centers) == len(widths) == 2
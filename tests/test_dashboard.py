@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import synthetic_data
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'personalized_mkt.py')
+
+# The header each view starts with
+VIEW_HEADERS = {
+    "📈 Cluster Summary": "Customer Segment Overview",
+    "💰 Sales Trends": "Sales Performance Analysis",
+    "🏙️ City-Wise View": "City-Wise Performance",
+    "🎯 Marketing Strategy": "🎯 Dynamic Marketing Strategy"
+}
+
+
+@pytest.fixture(scope='module')
+def source(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('dashboard') / 'customers.csv')
+    synthetic_data.write_csv(synthetic_data.customers(2_000, seed=0), path)
+    return path
+
+
+@pytest.fixture
+def app(source, tmp_path, monkeypatch):
+    def make(**env):
+        monkeypatch.setenv('DATA_SOURCE', source)
+        monkeypatch.setenv('SNAPSHOT_DIR', str(tmp_path / 'snapshot'))
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        # The data service is a process-wide resource; start each test from a clean one
+        st.cache_resource.clear()
+        at = AppTest.from_file(SCRIPT, default_timeout=60)
+        at.run()
+        assert not at.exception
+        return at
+    yield make
+    st.cache_resource.clear()
+
+
+def headers(at):
+    return {h.value for h in at.header} & set(VIEW_HEADERS.values())
+
+
+def test_only_the_selected_view_renders(app):
+    at = app()
+    assert headers(at) == {"Customer Segment Overview"}
+    # Downloads belong to the City-Wise and Marketing views
+    assert len(at.get('download_button')) == 0
+
+    for label, header in VIEW_HEADERS.items():
+        at.radio(key='active_tab').set_value(label).run()
+        assert not at.exception
+        assert headers(at) == {header}
+
+
+def test_views_stay_lazy_across_filter_changes(app):
+    at = app()
+    at.radio(key='active_tab').set_value("🏙️ City-Wise View").run()
+    cities = at.sidebar.multiselect[1]
+    cities.set_value(cities.value[:2]).run()
+
+    assert headers(at) == {"City-Wise Performance"}
+    assert len(at.get('download_button')) == 2
+
+
+def test_profile_times_only_the_selected_view(app):
+    at = app(PROFILE_DASHBOARD='1')
+    timings = at.sidebar.dataframe[0].value
+    stages = [stage.strip() for stage in timings['stage']]
+
+    assert 'imports' in stages
+    assert [stage for stage in stages if stage.startswith('tab')] == ['tab1 Cluster Summary']
+    # Chart payloads are sized after the rerun is timed, but still reported
+    sent = timings[timings['stage'].str.strip().str.startswith('send ')]
+    assert len(sent) and (sent['bytes'] > 0).all()
+
+
+def test_eager_tabs_render_every_view(app):
+    at = app(LAZY_TABS='0')
+    assert len(at.tabs) == 4
+    assert headers(at) == set(VIEW_HEADERS.values())
+
+
+def refreshers():
+    return [t for t in threading.enumerate() if t.name == 'data-refresher' and t.is_alive()]
+
+
+def test_clearing_the_cache_stops_the_refresher(app):
+    app()
+    assert len(refreshers()) == 1
+
+    st.cache_resource.clear()
+    deadline = time.monotonic() + 5
+    while refreshers() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not refreshers()
@@ -0,0 +1,28 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import export
+
+
+def chunk(cities, sales):
+    return pd.DataFrame({'outlet_city': pd.Categorical(cities), 'total_sales': sales})
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet'])
+def test_categorical_chunks_share_one_plain_schema(tmp_path, fmt):
+    # Each chunk has its own categories, as slices of a compact table do
+    frames = [chunk(['Kandy', 'Galle'], [1.0, 2.0]), chunk(['Colombo'], [3.0])]
+    path = str(tmp_path / f'out.{fmt}')
+
+    assert export.write_frames(frames, path, fmt, frames[0].iloc[:0]) == 3
+
+    written = pd.read_csv(path) if fmt == 'csv' else pq.read_table(path).to_pandas()
+    assert list(written['outlet_city']) == ['Kandy', 'Galle', 'Colombo']
+    assert list(written['total_sales']) == [1.0, 2.0, 3.0]
+
+
+def test_empty_export_keeps_columns(tmp_path):
+    path = str(tmp_path / 'empty.parquet')
+    assert export.write_frames([], path, 'parquet', chunk([], [])) == 0
+    assert pq.read_table(path).schema.field('outlet_city').type == 'string'
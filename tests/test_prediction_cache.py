@@ -0,0 +1,119 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch_scoring
+import prediction_cache
+import synthetic_data
+
+FEATURES = batch_scoring.FEATURES
+
+
+class CountingModel:
+    """Deterministic stand-in segment model that counts the rows it predicts"""
+
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, features):
+        self.rows += len(features)
+        values = features.to_numpy(dtype='float64')
+        return (np.floor(values[:, 0] / 500 + values[:, 1] / 2000 + values[:, 3]).astype('int64') % 6) + 1
+
+
+def cached_predict(cache, model, features):
+    pending = cache.lookup(features)
+    return cache.complete(pending, model(pending.missing_features))
+
+
+def batches(seed, n=2_000):
+    rng = np.random.default_rng(seed)
+    # Few distinct values, so batches repeat rows within and across each other
+    return pd.DataFrame({
+        'luxury_sales': rng.integers(0, 20, n) * 250.0,
+        'fresh_sales': rng.integers(0, 20, n) * 1000.0,
+        'dry_sales': rng.integers(0, 5, n) * 100.0,
+        'outlet_city': rng.integers(1, 5, n)
+    })
+
+
+def test_hits_and_misses_match_uncached_scores():
+    cache = prediction_cache.PredictionCache()
+    model = CountingModel()
+    for seed in range(4):
+        features = batches(seed)
+        np.testing.assert_array_equal(cached_predict(cache, model, features), CountingModel()(features))
+
+    distinct = len(pd.concat([batches(seed) for seed in range(4)]).drop_duplicates())
+    # Each distinct feature row reached the model exactly once
+    assert model.rows == distinct == len(cache)
+    assert cache.stats()['predicted'] == distinct
+    assert cache.stats()['hit_rate'] == pytest.approx(1 - distinct / 8_000)
+
+
+def test_rows_below_the_quantum_share_an_entry():
+    cache = prediction_cache.PredictionCache(quantum=10.0, quantize_columns=batch_scoring.SALES_FEATURES)
+    model = CountingModel()
+    features = pd.DataFrame({
+        'luxury_sales': [1000.0, 1001.0, 998.0, 1040.0, -0.0, 0.0, -0.4],
+        'fresh_sales': [2000.0, 2003.0, 1999.0, 2000.0, 0.0, 0.0, 0.0],
+        'dry_sales': [10.0, 12.0, 8.0, 10.0, 0.0, 0.0, 0.0],
+        'outlet_city': [3, 3, 3, 3, 1, 1, 1]
+    })
+    segments = cached_predict(cache, model, features)
+
+    # Rows 0-2 round to one key, row 3 is a step away; -0.0, 0.0 and -0.4 share the zero key
+    assert model.rows == len(cache) == 3
+    assert segments[0] == segments[1] == segments[2]
+    assert segments[4] == segments[5] == segments[6]
+
+
+def test_quantum_only_applies_to_the_given_columns():
+    cache = prediction_cache.PredictionCache(quantum=10.0, quantize_columns=batch_scoring.SALES_FEATURES)
+    features = pd.DataFrame({'luxury_sales': [5.0, 5.0], 'fresh_sales': [0.0, 0.0], 'dry_sales': [0.0, 0.0],
+                             'outlet_city': [1, 2]})
+    cached_predict(cache, CountingModel(), features)
+    assert len(cache) == 2
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'cache.arrow')
+    cache = prediction_cache.PredictionCache(quantum=10.0, quantize_columns=batch_scoring.SALES_FEATURES)
+    cached_predict(cache, CountingModel(), batches(0))
+    cache.save(path, FEATURES, 'digest')
+
+    loaded = prediction_cache.PredictionCache(quantum=10.0, quantize_columns=batch_scoring.SALES_FEATURES)
+    loaded.load(path, FEATURES, 'digest')
+    model = CountingModel()
+    np.testing.assert_array_equal(cached_predict(loaded, model, batches(0)), CountingModel()(batches(0)))
+    assert model.rows == 0
+
+    # Other artifacts or another quantum make the file unusable
+    for other in (prediction_cache.PredictionCache(quantum=10.0, quantize_columns=batch_scoring.SALES_FEATURES),
+                  prediction_cache.PredictionCache()):
+        other.load(path, FEATURES, 'other digest' if other.quantum else 'digest')
+        assert len(other) == 0
+
+
+def test_lru_bound():
+    cache = prediction_cache.PredictionCache(max_entries=10)
+    cached_predict(cache, CountingModel(), batches(0))
+    assert len(cache) == 10
+
+
+def test_cached_scoring_matches_uncached(stand_in, tmp_path):
+    extract = synthetic_data.scoring_extract(synthetic_data.customers(2_000, seed=3))
+    extract = pd.concat([extract, extract.assign(Customer_ID=extract['Customer_ID'] + 10_000)])
+    input_path = str(tmp_path / 'input.csv')
+    extract.to_csv(input_path, index=False)
+
+    outputs = {}
+    for name, cache in (('plain', None), ('cached', prediction_cache.PredictionCache())):
+        outputs[name] = str(tmp_path / f'{name}.csv')
+        batch_scoring.score_file(input_path, outputs[name], stand_in['model'], stand_in['scaler'], 500, 256,
+                                 cache=cache, log=io.StringIO())
+
+    pd.testing.assert_frame_equal(pd.read_csv(outputs['plain']), pd.read_csv(outputs['cached']))
+    assert cache.stats()['hit_rate'] == pytest.approx(0.5)
@@ -0,0 +1,130 @@
+"""preprocessing.py and the scoring transforms against the notebooks' own steps"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+import area_lookup
+import batch_scoring
+import model_serving
+import preprocessing
+
+MISSPELLINGS = {
+    'batticaloa': 'Batticaloa',
+    'kalmunai': 'Kalmunai',
+    'MoraTuwa': 'Moratuwa',
+    'PeliyagodA': 'Peliyagoda',
+    'Trincomale': 'Trincomalee'
+}
+
+
+def raw_extract():
+    """Small raw extract with every case the cleaning handles"""
+    return pd.DataFrame({
+        'Customer_ID': [1, 2, 3, np.nan, 5, 6, 7, 8, 9, 10, 11, 12],
+        'outlet_city': ['Colombo', 'Colombo', 'kalmunai', 'Kandy', None, 'Kalmunai', 'Kandy', 'Galle',
+                        'Colombo', 'MoraTuwa', 'Galle', 'Colombo'],
+        'luxury_sales': ['1,200', '800', None, '900', '700', 'n/a', '1,050.5', '600', '750', '1000', '820', '640'],
+        'fresh_sales': ['5000', None, '4,500', '3000', '2000', '2500', '2600', '7000', '1,100', '2200', '3300', '4100'],
+        'dry_sales': ['300', '250', '400', None, '100', '350', '1,000', '150', '200', None, '260', '310'],
+        'cluster_catgeory': ['1', '2', '3', '4', '5', '6', '98', '2', '1', '3', None, '4']
+    })
+
+
+def notebook_clean(train):
+    """Updated_Data_Preprocessing_Train.ipynb, with the test notebook's number parsing and spelling fixes"""
+    train = train.copy()
+    train.rename(columns={'cluster_catgeory': 'cluster_category'}, inplace=True)
+    for col in ['luxury_sales', 'fresh_sales', 'dry_sales']:
+        train[col] = pd.to_numeric(train[col].astype(str).str.replace(',', '', regex=True), errors='coerce')
+    train['cluster_category'] = pd.to_numeric(train['cluster_category'], errors='coerce').astype(float)
+    train = train.dropna(subset=['Customer_ID'])
+    train = train.dropna(subset=['outlet_city'])
+    for col in ['luxury_sales', 'fresh_sales', 'dry_sales']:
+        train[col] = train[col].fillna(train[col].median())
+    train = train[train['cluster_category'] <= 6]
+    train['outlet_city'] = train['outlet_city'].replace(MISSPELLINGS)
+    city_totals = pd.crosstab(train['outlet_city'], train['cluster_category']).sum(axis=1)
+    area_mapping = (city_totals > city_totals.median()).map({True: 'Urban', False: 'Suburban'}).to_dict()
+    train['Area'] = train['outlet_city'].map(area_mapping)
+    train['total_sales'] = train['luxury_sales'] + train['fresh_sales'] + train['dry_sales']
+    return train.reset_index(drop=True), area_mapping
+
+
+def test_clean_matches_notebook():
+    expected, expected_areas = notebook_clean(raw_extract())
+    cleaned = preprocessing.clean(raw_extract())
+
+    pd.testing.assert_frame_equal(cleaned, expected, check_dtype=False)
+    parsed = preprocessing.ParsedExtract(raw_extract())
+    assert preprocessing.area_mapping(parsed.city_totals()) == expected_areas
+
+
+def test_unseen_city_gets_nan_area_like_the_notebook():
+    _, train_areas = notebook_clean(raw_extract())
+    medians = {'luxury_sales': 800.0, 'fresh_sales': 3000.0, 'dry_sales': 250.0}
+    test = raw_extract()
+    test.loc[0, 'outlet_city'] = 'Jaffna'  # not in the training map
+
+    cleaned = preprocessing.clean(test, medians=medians, area_map=train_areas)
+    expected = test.rename(columns={'cluster_catgeory': 'cluster_category'})
+    expected = expected.dropna(subset=['Customer_ID', 'outlet_city'])
+    expected = expected[pd.to_numeric(expected['cluster_category']) <= 6]
+    expected = expected['outlet_city'].replace(MISSPELLINGS).map(train_areas)
+
+    assert cleaned.loc[0, 'outlet_city'] == 'Jaffna'
+    assert pd.isna(cleaned.loc[0, 'Area'])
+    assert cleaned['Area'].tolist() == expected.tolist()
+    # Imputation used the given (training) medians, not this extract's
+    assert cleaned.loc[cleaned['Customer_ID'] == 3, 'luxury_sales'].item() == 800.0
+
+
+def test_scored_output_matches_deployment_notebook():
+    # Outlet codes as in the cleaned test extract; 99 is unknown to the notebook's map
+    chunk = pd.DataFrame({'Customer_ID': [1, 2, 3, 4], 'luxury_sales': [1.0, 2.0, 3.0, 4.0],
+                          'fresh_sales': [5.0, 6.0, 7.0, 8.0], 'dry_sales': [9.0, 1.0, 2.0, 3.0],
+                          'outlet_city': [2, 11, 99, 2]})
+    classes = np.array([0, 5, 3, 2])
+    area_map = {'Colombo': 'Urban', 'Kandy': 'Suburban'}
+
+    scored = batch_scoring.attach_area(batch_scoring.score_chunk(chunk, classes + 1), area_map)
+
+    pred = chunk[['Customer_ID', 'outlet_city', 'luxury_sales', 'fresh_sales', 'dry_sales']].copy()
+    pred['predicted_customer_segmentation'] = classes
+    pred['outlet_city'] = pred['outlet_city'].map(area_lookup.OUTLET_CITY_MAP)
+    pred['predicted_customer_segmentation'] = pred['predicted_customer_segmentation'].map(
+        {0: 1, 1: 2, 2: 3, 3: 4, 4: 5, 5: 6})
+    pred['Area'] = pred['outlet_city'].map(area_map)
+    pred = pred.dropna(subset=['outlet_city', 'Area'])
+
+    columns = ['Customer_ID', 'outlet_city', 'luxury_sales', 'fresh_sales', 'dry_sales',
+               'predicted_customer_segmentation', 'Area']
+    pd.testing.assert_frame_equal(scored[columns], pred[columns])
+
+
+class SoftmaxModel:
+    """Keras-like model: predict() returns class probabilities"""
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    def predict(self, X):
+        logits = X @ self.weights
+        prob = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return prob / prob.sum(axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize('batch_size', [3, 1000])
+def test_scaling_and_label_encoding_match_notebook(batch_size):
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.gamma(4, 300, 200), rng.gamma(4, 1000, 200), rng.gamma(4, 800, 200),
+                         rng.integers(1, 23, 200)]).astype('float64')
+    scaler = StandardScaler().fit(X)
+    model = SoftmaxModel(rng.normal(size=(4, 6)))
+
+    # Neural_Network.ipynb / Deployment_NN.ipynb: scale, argmax, then classes 0..5 -> segments 1..6
+    expected = np.argmax(model.predict(scaler.transform(X)), axis=1) + 1
+
+    segments, probabilities = model_serving.SegmentModel('nn', model, scaler).predict_segments(X, batch_size)
+    np.testing.assert_array_equal(segments, expected)
+    assert probabilities.shape == (200, 6)
@@ -0,0 +1,174 @@
+import http.client
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import scoring_service
+
+
+class CountingModel:
+    """Stand-in model recording the rows of every call; segment = 1 + luxury_sales % 6"""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.error = None
+
+    def predict_segments(self, X, batch_size=8192):
+        self.calls.append(len(X))
+        self.gate.wait()
+        if self.error is not None:
+            raise self.error
+        segments = 1 + X['luxury_sales'].to_numpy().astype('int64') % 6
+        probabilities = np.full((len(X), 6), 1 / 6, dtype='float32')
+        return segments, probabilities
+
+
+def features(luxury_sales):
+    return np.array([[value, 0.0, 0.0, 1.0] for value in luxury_sales])
+
+
+def predict_concurrently(batcher, requests):
+    results = [None] * len(requests)
+
+    def run(i):
+        results[i] = batcher.predict(requests[i])[0].tolist()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def model():
+    return CountingModel()
+
+
+def hold_first_batch(batcher, model):
+    """Keep the model busy with one request so the next ones pile up in the queue"""
+    model.gate.clear()
+    threads, _ = predict_concurrently(batcher, [features([0])])
+    wait_for(lambda: model.calls == [1])
+    return threads
+
+
+def test_concurrent_requests_share_one_model_call(model):
+    batcher = scoring_service.DynamicBatcher(model, max_batch=1024, max_wait_ms=50).start()
+    held = hold_first_batch(batcher, model)
+    requests = [features([i, i + 1]) for i in range(8)]
+    threads, results = predict_concurrently(batcher, requests)
+    wait_for(lambda: batcher._queue.qsize() == len(requests))
+    model.gate.set()
+    for thread in held + threads:
+        thread.join()
+
+    assert model.calls == [1, 16]
+    # Every request gets back its own rows of the shared batch
+    assert results == [[1 + i % 6, 1 + (i + 1) % 6] for i in range(8)]
+    assert batcher.stats.stats()['batches'] == 2
+
+
+def test_batches_stop_at_max_batch(model):
+    batcher = scoring_service.DynamicBatcher(model, max_batch=4, max_wait_ms=50).start()
+    held = hold_first_batch(batcher, model)
+    threads, _ = predict_concurrently(batcher, [features([i]) for i in range(10)])
+    wait_for(lambda: batcher._queue.qsize() == 10)
+    model.gate.set()
+    for thread in held + threads:
+        thread.join()
+
+    assert model.calls == [1, 4, 4, 2]
+
+
+def test_a_lone_request_waits_at_most_max_wait(model):
+    batcher = scoring_service.DynamicBatcher(model, max_batch=1024, max_wait_ms=20).start()
+    start = time.perf_counter()
+    batcher.predict(features([1]))
+    elapsed = time.perf_counter() - start
+
+    assert 0.02 <= elapsed < 1
+    # A request arriving after the deadline goes into a batch of its own
+    batcher.predict(features([2]))
+    assert model.calls == [1, 1]
+
+
+def test_model_errors_reach_every_request_of_the_batch(model):
+    batcher = scoring_service.DynamicBatcher(model, max_wait_ms=1).start()
+    model.error = RuntimeError("model failed")
+    with pytest.raises(RuntimeError, match="model failed"):
+        batcher.predict(features([1]))
+
+    # The batcher keeps serving after a failed batch
+    model.error = None
+    assert batcher.predict(features([1]))[0].tolist() == [2]
+
+
+@pytest.fixture
+def server(model):
+    server = scoring_service.serve(scoring_service.ScoringService(model, max_wait_ms=1), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, body):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=10)
+    try:
+        connection.request('POST', '/score', body if isinstance(body, str) else json.dumps(body),
+                           {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+CUSTOMER = {'Customer_ID': 7, 'luxury_sales': 2, 'fresh_sales': 800, 'dry_sales': 5300, 'outlet_city': 'Kelaniya'}
+
+
+def test_score_returns_segment_and_offers(server):
+    status, body = post(server, {'customers': [CUSTOMER, dict(CUSTOMER, Customer_ID=8, luxury_sales=3)]})
+
+    assert status == 200
+    assert [r['Customer_ID'] for r in body['results']] == [7, 8]
+    assert [r['segment'] for r in body['results']] == [3, 4]
+    assert body['results'][0]['segment_name'] == scoring_service.marketing.CLUSTER_MAPPING[3]
+
+
+@pytest.mark.parametrize('body', [
+    '{"luxury_sales": ',
+    [],
+    {'customers': []},
+    {'luxury_sales': 1, 'fresh_sales': 2, 'dry_sales': 3},
+    dict(CUSTOMER, outlet_city='Atlantis'),
+    dict(CUSTOMER, fresh_sales='a lot')
+])
+def test_bad_payloads_are_400(server, model, body):
+    status, response = post(server, body)
+
+    assert status == 400
+    assert response['error']
+    assert model.calls == []
+    assert server.service.stats.stats()['errors'] == 1
+
+
+def test_model_errors_are_500(server, model):
+    model.error = RuntimeError("model failed")
+    status, response = post(server, CUSTOMER)
+
+    assert status == 500
+    assert response == {'error': "model failed"}
+    assert server.service.stats.stats()['errors'] == 1
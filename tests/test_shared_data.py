@@ -0,0 +1,156 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import analytics
+import segment_cube
+import shared_data
+import snapshot_store
+import synthetic_data
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / 'customers.csv')
+    synthetic_data.write_csv(synthetic_data.customers(500, seed=0), path)
+    return path
+
+
+@pytest.fixture
+def loader(source, tmp_path):
+    calls = {'built': 0}
+
+    def load(current=None):
+        df, _ = snapshot_store.refresh(source, str(tmp_path / 'snapshot'), reload=current is None)
+        if df is None:
+            return None
+        calls['built'] += 1
+        return analytics.prepare(df)
+
+    load.calls = calls
+    return load
+
+
+@pytest.fixture
+def service(loader):
+    services = []
+
+    def make(ttl):
+        services.append(shared_data.SharedDataService(loader, ttl))
+        return services[-1]
+
+    yield make
+    for started in services:
+        started.close(timeout=5)
+
+
+def test_refresh_reports_changes(source, tmp_path):
+    directory = str(tmp_path / 'snapshot')
+    df, changed = snapshot_store.refresh(source, directory)
+    assert changed and len(df) > 0
+
+    assert snapshot_store.refresh(source, directory, reload=False) == (None, False)
+    df, changed = snapshot_store.refresh(source, directory)
+    assert not changed and len(df) > 0
+
+
+def test_unchanged_refresh_keeps_snapshot_and_version(service, loader):
+    service = service(ttl=0.02)
+    first = service.get()
+    service.start()
+    wait_for(lambda: service.checks >= 4)
+
+    assert service.get() is first
+    assert service.stats()['version'] == first.version
+    assert loader.calls['built'] == 1
+    assert service.stats()['misses'] == 1
+    assert service.last_error is None
+
+
+def test_changed_source_swaps_in_new_version(service, source):
+    service = service(ttl=300)
+    first = service.get()
+    synthetic_data.write_csv(synthetic_data.customers(700, seed=1), source)
+    os.utime(source, (time.time() + 10, time.time() + 10))
+    service.refresh()
+    wait_for(lambda: service.get().version > first.version)
+
+    assert len(service.get().df) != len(first.df)
+
+
+def test_failed_refresh_is_reported_and_keeps_snapshot(service, source):
+    service = service(ttl=300)
+    first = service.get()
+    os.remove(source)
+    service.refresh()
+    wait_for(lambda: service.last_error is not None)
+
+    assert service.get() is first
+    assert service.stats()['last_error']
+
+
+def test_stats_do_not_rescan_the_frame(service, monkeypatch):
+    service = service(ttl=300)
+    snapshot = service.get()
+    expected = snapshot.nbytes
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("memory_usage called on a rerun")
+
+    monkeypatch.setattr(pd.DataFrame, 'memory_usage', no_scan)
+    assert service.stats()['snapshot_mb'] == expected / (1 << 20)
+
+
+def test_close_stops_the_refresher(service):
+    service = service(ttl=0.01)
+    service.get()
+    service.start()
+    wait_for(lambda: service.checks >= 2)
+    service.close(timeout=5)
+
+    assert not service._thread.is_alive()
+    checks = service.checks
+    service.refresh()
+    time.sleep(0.05)
+    assert service.checks == checks
+
+
+def replace_source(source, rows, seed):
+    synthetic_data.write_csv(synthetic_data.customers(rows, seed=seed), source)
+    os.utime(source, (time.time() + 10, time.time() + 10))
+
+
+def everything(snapshot):
+    return analytics.selection(*(snapshot.df[col].dropna().unique() for col in segment_cube.DIMENSIONS))
+
+
+def test_versions_are_unique_across_services(service, source):
+    # A cleared cache_resource builds a new service; its results must not collide with the old one's
+    old = service(ttl=300).get()
+    assert analytics.kpis(old, everything(old))['total_customers'] == len(old.df)
+
+    replace_source(source, 700, seed=1)
+    new = service(ttl=300).get()
+    assert new.version != old.version
+    assert analytics.kpis(new, everything(new))['total_customers'] == len(new.df) == 700
+
+
+def test_filtered_rows_follow_a_new_service(service, source):
+    old = service(ttl=300).get()
+    segments, all_cities, areas = everything(old)
+    cities = analytics.selection(segments, all_cities[:2], areas)
+    assert len(analytics.selected_rows(old, cities)) < len(old.df)
+
+    replace_source(source, 700, seed=1)
+    new = service(ttl=300).get()
+    rows = analytics.selected_rows(new, cities)
+    assert rows.index.isin(new.df.index).all()
+    assert len(rows) == new.df['outlet_city'].isin(cities[1]).sum()
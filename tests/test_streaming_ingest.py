@@ -0,0 +1,113 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import streaming_ingest
+from streaming_ingest import QuantileSketch
+
+QUANTILES = [0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+
+def sales(rng, n):
+    # Positive and heavy-tailed, like the sales columns
+    return rng.lognormal(mean=8, sigma=1.5, size=n)
+
+
+def assert_within(sketch, values, accuracy):
+    for q in QUANTILES:
+        expected = np.quantile(values, q)
+        assert sketch.quantile(q) == pytest.approx(expected, rel=accuracy, abs=1e-9), q
+
+
+def test_exact_below_max_distinct():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 500, size=10_000).astype('float64')
+    sketch = QuantileSketch(max_distinct=1_000)
+    sketch.update(values)
+
+    assert sketch.exact
+    for q in QUANTILES:
+        assert sketch.quantile(q) == np.quantile(values, q)
+    assert sketch.median() == np.median(values)
+
+
+@pytest.mark.parametrize('accuracy', [0.005, 0.02])
+def test_collapsed_sketch_within_relative_accuracy(accuracy):
+    rng = np.random.default_rng(1)
+    values = sales(rng, 50_000)
+    sketch = QuantileSketch(max_distinct=1_000, relative_accuracy=accuracy)
+    sketch.update(values)
+
+    assert not sketch.exact
+    assert_within(sketch, values, accuracy)
+
+
+def test_merged_partitions_match_whole_column():
+    rng = np.random.default_rng(2)
+    parts = [sales(rng, n) for n in (20_000, 5_000, 300)]
+    # One partition stays exact, so merging has to collapse it into buckets
+    sketches = [QuantileSketch(max_distinct=1_000) for _ in parts]
+    for sketch, part in zip(sketches, parts):
+        sketch.update(part)
+    assert [s.exact for s in sketches] == [False, False, True]
+
+    merged = QuantileSketch(max_distinct=1_000)
+    for sketch in sketches:
+        merged.merge(sketch)
+
+    assert_within(merged, np.concatenate(parts), 0.005)
+
+
+def test_merged_exact_partitions_stay_exact():
+    rng = np.random.default_rng(3)
+    parts = [rng.integers(0, 100, size=1_000).astype('float64') for _ in range(3)]
+    merged = QuantileSketch(max_distinct=1_000)
+    for part in parts:
+        sketch = QuantileSketch(max_distinct=1_000)
+        sketch.update(part)
+        merged.merge(sketch)
+
+    assert merged.exact
+    assert merged.median() == np.median(np.concatenate(parts))
+
+
+def test_ignores_nan_and_handles_empty():
+    sketch = QuantileSketch()
+    assert np.isnan(sketch.median())
+    sketch.update(np.array([1.0, np.nan, 3.0]))
+    assert sketch.median() == 2.0
+
+
+def raw_extract(path, rows, seed):
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        'Customer_ID': np.arange(1, rows + 1),
+        'outlet_city': rng.choice(['Colombo', 'Kandy', 'Galle', 'kalmunai'], size=rows),
+        'luxury_sales': rng.integers(100, 2_000, size=rows),
+        'fresh_sales': rng.integers(100, 9_000, size=rows),
+        'dry_sales': rng.integers(100, 9_000, size=rows),
+        'cluster_catgeory': rng.integers(1, 7, size=rows)
+    }).to_csv(path, index=False)
+
+
+def test_rerun_into_same_directory_replaces_partitions(tmp_path):
+    output = str(tmp_path / 'cleaned')
+    large, small = str(tmp_path / 'large.csv'), str(tmp_path / 'small.csv')
+    raw_extract(large, 1_000, seed=0)
+    raw_extract(small, 250, seed=1)
+
+    streaming_ingest.main([large, '--output', output, '--chunk-size', '100'])
+    assert len(glob.glob(os.path.join(output, 'part-*.csv'))) == 10
+
+    streaming_ingest.main([small, '--output', output, '--chunk-size', '100'])
+    parts = sorted(glob.glob(os.path.join(output, 'part-*.csv')))
+    assert [os.path.basename(p) for p in parts] == ['part-00000.csv', 'part-00001.csv', 'part-00002.csv']
+    cleaned = pd.concat([pd.read_csv(p) for p in parts])
+    with open(os.path.join(output, '_stats.json')) as f:
+        stats = json.load(f)
+    assert len(cleaned) == stats['rows_out'] == 250
+    assert stats['inputs'] == [small]